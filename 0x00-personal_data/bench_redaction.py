@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the redaction path of filtered_logger.
+Synthetic records vary the number of redacted fields, the message length
+and the separator density; filter_datum and RedactingFormatter.format
+are timed per record and the results can be saved as JSON and compared
+against a stored baseline.
+"""
+
+import argparse
+import json
+import logging
+import random
+import string
+import time
+from typing import Dict, List
+
+from filtered_logger import RedactingFormatter, filter_datum
+
+
+FIELD_COUNTS = (1, 5, 10)
+MESSAGE_LENGTHS = (80, 512)
+SEPARATOR_DENSITIES = (2, 10)
+
+
+def generate_records(count: int, field_count: int, message_length: int,
+                     separator_density: int, seed: int = 0) -> List[str]:
+    """
+    Returns count synthetic "key=value;" messages of about message_length
+    characters, with separator_density separators per 100 characters.
+    The first field_count keys are the fields to redact.
+    """
+    rand = random.Random(seed)
+    pairs = max(field_count, message_length * separator_density // 100, 1)
+    keys = ["field{}".format(i) for i in range(pairs)]
+    value_length = max(message_length // pairs - len(keys[-1]) - 2, 1)
+    alphabet = string.ascii_letters + string.digits + "@.-"
+
+    records = []
+    for _ in range(count):
+        rand.shuffle(keys)
+        records.append("".join(
+            "{}={};".format(key, "".join(rand.choices(alphabet,
+                                                      k=value_length)))
+            for key in keys))
+    return records
+
+
+def percentile(samples: List[int], pct: float) -> float:
+    """
+    Returns the pct percentile of sorted samples.
+    """
+    index = min(int(round(pct / 100 * (len(samples) - 1))), len(samples) - 1)
+    return samples[index]
+
+
+def summarize(latencies: List[int]) -> Dict[str, float]:
+    """
+    Returns throughput and latency percentiles (in microseconds) for a
+    list of per-record latencies in nanoseconds, all zero if it is empty.
+    """
+    if not latencies:
+        return dict.fromkeys(("lines_per_second", "p50_us", "p90_us",
+                              "p99_us", "max_us"), 0.0)
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "lines_per_second": len(latencies) * 1e9 / total if total else 0.0,
+        "p50_us": percentile(latencies, 50) / 1000,
+        "p90_us": percentile(latencies, 90) / 1000,
+        "p99_us": percentile(latencies, 99) / 1000,
+        "max_us": latencies[-1] / 1000,
+    }
+
+
+def bench_filter_datum(records: List[str], fields: List[str]) -> List[int]:
+    """
+    Returns the latency in nanoseconds of filter_datum for each record.
+    """
+    latencies = []
+    clock = time.perf_counter_ns
+    for message in records:
+        start = clock()
+        filter_datum(fields, RedactingFormatter.REDACTION, message,
+                     RedactingFormatter.SEPARATOR)
+        latencies.append(clock() - start)
+    return latencies
+
+
+def bench_formatter(records: List[str], fields: List[str]) -> List[int]:
+    """
+    Returns the latency in nanoseconds of RedactingFormatter.format for
+    each record.
+    """
+    formatter = RedactingFormatter(fields)
+    log_records = [logging.LogRecord("user_data", logging.INFO, __file__, 0,
+                                     message, None, None)
+                   for message in records]
+    latencies = []
+    clock = time.perf_counter_ns
+    for record in log_records:
+        start = clock()
+        formatter.format(record)
+        latencies.append(clock() - start)
+    return latencies
+
+
+def run(count: int, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """
+    Runs every benchmark on every scenario and returns the results keyed
+    by "<benchmark>/fields=<n>/length=<n>/density=<n>".
+    """
+    results = {}
+    for field_count in FIELD_COUNTS:
+        for message_length in MESSAGE_LENGTHS:
+            for density in SEPARATOR_DENSITIES:
+                records = generate_records(count, field_count,
+                                           message_length, density, seed)
+                fields = ["field{}".format(i) for i in range(field_count)]
+                scenario = "fields={}/length={}/density={}".format(
+                    field_count, message_length, density)
+                for name, bench in (("filter_datum", bench_filter_datum),
+                                    ("format", bench_formatter)):
+                    results["{}/{}".format(name, scenario)] = summarize(
+                        bench(records, fields))
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]]) -> None:
+    """
+    Prints the throughput of results relative to a baseline.
+    """
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or not base["lines_per_second"]:
+            print("{:<50} (no baseline)".format(name))
+            continue
+        ratio = result["lines_per_second"] / base["lines_per_second"]
+        print("{:<50} {:>12.0f} lines/s  x{:.2f}".format(
+            name, result["lines_per_second"], ratio))
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark filter_datum and RedactingFormatter.format.")
+    parser.add_argument("--records", type=int, default=10000,
+                        help="records per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against this file")
+    args = parser.parse_args()
+    if args.records < 1:
+        parser.error("--records must be at least 1")
+
+    results = run(args.records, args.seed)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            compare(results, json.load(f))
+    else:
+        for name, result in results.items():
+            print("{:<50} {:>12.0f} lines/s  p50={:.1f}us p99={:.1f}us"
+                  .format(name, result["lines_per_second"],
+                          result["p50_us"], result["p99_us"]))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
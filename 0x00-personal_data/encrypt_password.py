@@ -5,6 +5,11 @@ This module provides functionality to hash passwords securely
 and validate them against stored hashes using bcrypt.
 """
 
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Tuple
+
 import bcrypt
 
 
@@ -21,3 +26,63 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
     Returns True if the password is valid, False otherwise.
     """
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password)
+
+
+def _check_pair(pair: Tuple[bytes, str]) -> bool:
+    """
+    Returns is_valid for a (hashed_password, password) pair.
+    """
+    return is_valid(*pair)
+
+
+def _imap(func: Callable, items: Iterable,
+          max_workers: int = None) -> Iterator:
+    """
+    Yields func(item) for every item, in input order, computed by a pool
+    of max_workers threads. bcrypt releases the GIL, so the calls run in
+    parallel. At most two items per worker are in flight at a time.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for item in items:
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+            pending.append(executor.submit(func, item))
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_hash_passwords(passwords: Iterable[str],
+                        max_workers: int = None) -> Iterator[bytes]:
+    """
+    Yields the hash of every password, in input order.
+    """
+    return _imap(hash_password, passwords, max_workers)
+
+
+def iter_are_valid(pairs: Iterable[Tuple[bytes, str]],
+                   max_workers: int = None) -> Iterator[bool]:
+    """
+    Yields is_valid for every (hashed_password, password) pair, in
+    input order.
+    """
+    return _imap(_check_pair, pairs, max_workers)
+
+
+def hash_passwords(passwords: Iterable[str],
+                   max_workers: int = None) -> List[bytes]:
+    """
+    Returns the hashes of passwords, in input order, computed by a pool
+    of max_workers threads (default: number of CPUs).
+    """
+    return list(iter_hash_passwords(passwords, max_workers))
+
+
+def are_valid(pairs: Iterable[Tuple[bytes, str]],
+              max_workers: int = None) -> List[bool]:
+    """
+    Returns is_valid for every (hashed_password, password) pair, in
+    input order, computed by a pool of max_workers threads.
+    """
+    return list(iter_are_valid(pairs, max_workers))
@@ -6,13 +6,66 @@ in log records and connect to databases securely.
 """
 
 import re
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import sqlite3
+import sys
+import threading
 import mysql.connector
-from typing import List
+from functools import lru_cache
+from typing import Iterable, List, Sequence, TextIO, Tuple
 
 
 PII_FIELDS = ("name", "email", "phone", "ssn", "password")
+EXPORT_BATCH_SIZE = 1000
+
+
+class RedactionEngine:
+    """
+    Redacts every field of a message in a single regex scan.
+    All fields are compiled into one alternation pattern, so the cost of
+    a call no longer grows with the number of fields.
+    """
+
+    def __init__(self, fields: Tuple[str, ...], redaction: str,
+                 separator: str):
+        """
+        Compile the combined pattern for fields and separator.
+        """
+        self.fields = fields
+        self.redaction = redaction
+        self.separator = separator
+        self._suffix = f'={redaction}{separator}'
+        self._pattern = None
+        if fields:
+            self._pattern = re.compile(
+                f'({"|".join(fields)})=.*?(?:{separator})')
+
+    def _replace(self, match: re.Match) -> str:
+        """
+        Returns the redacted replacement for one matched field.
+        """
+        return match.group(1) + self._suffix
+
+    def redact(self, message: str) -> str:
+        """
+        Returns message with all field values replaced by the redaction.
+        """
+        if self._pattern is None:
+            return message
+        return self._pattern.sub(self._replace, message)
+
+
+@lru_cache(maxsize=64)
+def get_redaction_engine(fields: Tuple[str, ...], redaction: str,
+                         separator: str) -> RedactionEngine:
+    """
+    Returns the cached RedactionEngine for (fields, separator, redaction).
+    """
+    return RedactionEngine(fields, redaction, separator)
 
 
 def filter_datum(fields: List[str], redaction: str, message: str,
@@ -21,10 +74,8 @@ def filter_datum(fields: List[str], redaction: str, message: str,
     Returns the log message obfuscated by replacing field values with
     redaction string using regex substitution.
     """
-    for field in fields:
-        message = re.sub(f'{field}=.*?{separator}',
-                         f'{field}={redaction}{separator}', message)
-    return message
+    engine = get_redaction_engine(tuple(fields), redaction, separator)
+    return engine.redact(message)
 
 
 class RedactingFormatter(logging.Formatter):
@@ -42,19 +93,163 @@ class RedactingFormatter(logging.Formatter):
         """
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self._engine = get_redaction_engine(tuple(fields), self.REDACTION,
+                                            self.SEPARATOR)
 
     def format(self, record: logging.LogRecord) -> str:
         """
-        Filter values in incoming log records using filter_datum.
+        Filter values in incoming log records using the redaction engine.
+        Records logged with extra={"redacted": True} are already masked
+        and skip the regex pass.
         """
-        record.msg = filter_datum(self.fields, self.REDACTION,
-                                  record.getMessage(), self.SEPARATOR)
+        if not getattr(record, "redacted", False):
+            record.msg = self._engine.redact(record.getMessage())
         return super(RedactingFormatter, self).format(record)
 
+    def format_batch(self, messages: Iterable[str], name: str = "user_data",
+                     level: int = logging.INFO,
+                     redacted: bool = False) -> str:
+        """
+        Returns the redacted, newline-terminated lines for a batch of
+        messages. The record prefix is formatted once for the whole batch.
+        """
+        record = logging.LogRecord(name, level, __file__, 0, "", None, None)
+        prefix = super(RedactingFormatter, self).format(record)
+        if redacted:
+            return "".join([prefix + message + "\n" for message in messages])
+        redact = self._engine.redact
+        return "".join([prefix + redact(message) + "\n"
+                        for message in messages])
+
+
+class ColumnRedactor:
+    """
+    Formats database rows as "column=value;" log messages, masking the
+    PII columns by index instead of regex-parsing the formatted string.
+    Rows the index-based masking would format differently from
+    filter_datum (a value holding the separator, "=" or a newline, which
+    ".*?" does not cross) go through filter_datum, so the output is
+    always the same.
+    """
+
+    def __init__(self, columns: Sequence[str], fields: Sequence[str],
+                 redaction: str = RedactingFormatter.REDACTION,
+                 separator: str = RedactingFormatter.SEPARATOR):
+        """
+        Build the message templates for the given column names.
+        """
+        self.columns = tuple(columns)
+        self._separator = separator
+        self._engine = get_redaction_engine(tuple(fields), redaction,
+                                            separator)
+        self._indexes = []
+        parts = []
+        plain_parts = []
+        for index, column in enumerate(self.columns):
+            name = column.replace("{", "{{").replace("}", "}}")
+            if column in fields:
+                value = redaction.replace("{", "{{").replace("}", "}}")
+            else:
+                value = "{}"
+                self._indexes.append(index)
+            parts.append(f"{name}={value}{separator}")
+            plain_parts.append(f"{name}={{}}{separator}")
+        self._template = " ".join(parts)
+        self._plain_template = " ".join(plain_parts)
+        # Column names the regex would match differently, e.g. a field
+        # name ending a longer column name
+        self._always_regex = any(
+            separator in column or "=" in column or
+            (column not in fields and
+             any(column.endswith(field) for field in fields))
+            for column in self.columns)
+
+    @classmethod
+    def from_cursor(cls, cursor, fields: Sequence[str] = PII_FIELDS):
+        """
+        Returns a ColumnRedactor for the columns of an executed cursor.
+        """
+        return cls([column[0] for column in cursor.description], fields)
+
+    def format_row(self, row: Sequence) -> str:
+        """
+        Returns the redacted log message for one row.
+        """
+        if self._always_regex or any(
+                self._separator in text or "=" in text or "\n" in text
+                for text in map(str, row)):
+            return self._engine.redact(self._plain_template.format(*row))
+        return self._template.format(*[row[i] for i in self._indexes])
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler writing to a bounded queue with an overflow policy:
+    "block" waits for room, "drop_oldest" discards the oldest queued
+    record and "drop_newest" discards the incoming one.
+    """
+
+    OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+    def __init__(self, record_queue: queue.Queue, overflow: str = "block"):
+        """
+        Initialize the handler with its queue and overflow policy.
+        """
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow}")
+        super(BoundedQueueHandler, self).__init__(record_queue)
+        self.overflow = overflow
+        self.dropped = 0
+        self.listener = None
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        Put record on the queue according to the overflow policy.
+        """
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                if self.overflow == "drop_newest":
+                    self.dropped += 1
+                    return
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
 
-def get_logger() -> logging.Logger:
+
+class _QueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that can be stopped more than once and waits for room
+    on a full queue instead of failing to enqueue its sentinel.
+    """
+
+    def enqueue_sentinel(self) -> None:
+        """
+        Put the stop sentinel on the queue, waiting for room if needed.
+        """
+        self.queue.put(self._sentinel)
+
+    def stop(self) -> None:
+        """
+        Flush the queued records and stop the listener thread.
+        """
+        if self._thread is not None:
+            super(_QueueListener, self).stop()
+
+
+def get_logger(queued: bool = False, queue_size: int = 10000,
+               overflow: str = "block") -> logging.Logger:
     """
     Returns a logging.Logger object configured for user data logging.
+    With queued=True records go through a bounded queue and are redacted
+    and written by a background listener thread, flushed at exit.
     """
     logger = logging.getLogger("user_data")
     logger.setLevel(logging.INFO)
@@ -63,42 +258,298 @@ def get_logger() -> logging.Logger:
     stream_handler = logging.StreamHandler()
     formatter = RedactingFormatter(list(PII_FIELDS))
     stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
+
+    if not queued:
+        logger.addHandler(stream_handler)
+        return logger
+
+    queue_handler = BoundedQueueHandler(queue.Queue(queue_size), overflow)
+    listener = _QueueListener(queue_handler.queue, stream_handler)
+    queue_handler.listener = listener
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(queue_handler)
 
     return logger
 
 
-def get_db():
+class _MySQLBackend:
+    """
+    Opens mysql.connector connections from PERSONAL_DATA_DB_* variables.
+    """
+
+    def connect(self):
+        """
+        Returns a new connection to the database.
+        """
+        username = os.environ.get("PERSONAL_DATA_DB_USERNAME", "root")
+        password = os.environ.get("PERSONAL_DATA_DB_PASSWORD", "")
+        host = os.environ.get("PERSONAL_DATA_DB_HOST", "localhost")
+        db_name = os.environ.get("PERSONAL_DATA_DB_NAME")
+
+        return mysql.connector.connect(
+            host=host,
+            user=username,
+            password=password,
+            database=db_name
+        )
+
+    def is_alive(self, connection) -> bool:
+        """
+        Returns True if the connection still reaches the server.
+        """
+        try:
+            return connection.is_connected()
+        except mysql.connector.Error:
+            return False
+
+    def cursor(self, connection, **kwargs):
+        """
+        Returns a cursor on connection.
+        """
+        return connection.cursor(**kwargs)
+
+
+class _SQLiteBackend:
+    """
+    Local SQLite stand-in, PERSONAL_DATA_DB_NAME being the database file.
+    """
+
+    def connect(self):
+        """
+        Returns a new connection to the database file.
+        """
+        db_name = os.environ.get("PERSONAL_DATA_DB_NAME") or ":memory:"
+        return sqlite3.connect(db_name, check_same_thread=False)
+
+    def is_alive(self, connection) -> bool:
+        """
+        Returns True if the connection can still run a query.
+        """
+        try:
+            connection.execute("SELECT 1;")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def cursor(self, connection, buffered: bool = None):
+        """
+        Returns a cursor on connection, SQLite cursors always stream.
+        """
+        return connection.cursor()
+
+
+DB_BACKENDS = {"mysql": _MySQLBackend, "sqlite": _SQLiteBackend}
+
+
+class PooledConnection:
+    """
+    Connection checked out of a ConnectionPool: close(), leaving a with
+    block or garbage collection gives it back to the pool, everything
+    else is delegated to the real connection.
+    """
+
+    def __init__(self, pool, connection):
+        """
+        Wrap connection checked out of pool.
+        """
+        self._pool = pool
+        self._connection = connection
+
+    def cursor(self, **kwargs):
+        """
+        Returns a cursor on the underlying connection.
+        """
+        return self._pool.backend.cursor(self._connection, **kwargs)
+
+    def close(self) -> None:
+        """
+        Returns the connection to the pool.
+        """
+        if self._connection is not None:
+            self._pool.release(self._connection)
+            self._connection = None
+
+    def __enter__(self) -> "PooledConnection":
+        """
+        Returns the connection for a with block.
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Returns the connection to the pool at the end of a with block.
+        """
+        self.close()
+
+    def __del__(self) -> None:
+        """
+        Returns a connection dropped without close() to the pool.
+        """
+        if self.__dict__.get("_connection") is not None:
+            self.close()
+
+    def __getattr__(self, name: str):
+        """
+        Delegates attribute access to the underlying connection.
+        """
+        return getattr(self._connection, name)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of at most size connections opened by backend.
+    Idle connections are health checked when they are checked out.
+    """
+
+    def __init__(self, backend, size: int = 5, name: str = "personal_data",
+                 timeout: float = 30.0):
+        """
+        Initialize an empty pool; get() waits at most timeout seconds
+        for a free connection.
+        """
+        self.backend = backend
+        self.size = size
+        self.name = name
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def get(self) -> PooledConnection:
+        """
+        Returns a healthy connection, waiting if all of them are in use.
+        Raises TimeoutError if none is given back within timeout seconds.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(
+                f"No free connection in pool {self.name} after "
+                f"{self.timeout}s ({self.size} in use)")
+        try:
+            while True:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    connection = self.backend.connect()
+                    break
+                if self.backend.is_alive(connection):
+                    break
+                self._discard(connection)
+        except Exception:
+            self._slots.release()
+            raise
+        return PooledConnection(self, connection)
+
+    def release(self, connection) -> None:
+        """
+        Puts a checked out connection back in the pool.
+        """
+        try:
+            connection.rollback()
+            self._idle.put(connection)
+        except Exception:
+            self._discard(connection)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        """
+        Closes all idle connections.
+        """
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def _discard(self, connection) -> None:
+        """
+        Closes a connection that leaves the pool.
+        """
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_db() -> PooledConnection:
     """
     Returns a connector to the database using environment variables.
+    Connections come from a pool named PERSONAL_DATA_DB_POOL_NAME holding
+    PERSONAL_DATA_DB_POOL_SIZE connections of PERSONAL_DATA_DB_BACKEND
+    ("mysql" or "sqlite"), waiting at most PERSONAL_DATA_DB_POOL_TIMEOUT
+    seconds for a free one; close() returns them to the pool.
     """
-    username = os.environ.get("PERSONAL_DATA_DB_USERNAME", "root")
-    password = os.environ.get("PERSONAL_DATA_DB_PASSWORD", "")
-    host = os.environ.get("PERSONAL_DATA_DB_HOST", "localhost")
-    db_name = os.environ.get("PERSONAL_DATA_DB_NAME")
+    name = os.environ.get("PERSONAL_DATA_DB_POOL_NAME", "personal_data")
+    with _POOLS_LOCK:
+        pool = _POOLS.get(name)
+        if pool is None:
+            backend = os.environ.get("PERSONAL_DATA_DB_BACKEND", "mysql")
+            size = int(os.environ.get("PERSONAL_DATA_DB_POOL_SIZE", 5))
+            timeout = float(
+                os.environ.get("PERSONAL_DATA_DB_POOL_TIMEOUT", 30))
+            pool = ConnectionPool(DB_BACKENDS[backend](), size, name,
+                                  timeout)
+            _POOLS[name] = pool
+    return pool.get()
 
-    return mysql.connector.connect(
-        host=host,
-        user=username,
-        password=password,
-        database=db_name
-    )
+
+def export_users(db, stream: TextIO = None,
+                 batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """
+    Streams the users table to stream in batches of batch_size rows.
+    Rows are pulled from an unbuffered cursor with fetchmany, redacted
+    and written with one write per batch, so memory stays flat whatever
+    the size of the table. Returns the number of exported rows.
+    """
+    if stream is None:
+        stream = sys.stderr
+    formatter = RedactingFormatter(list(PII_FIELDS))
+    cursor = db.cursor(buffered=False)
+    cursor.execute("SELECT * FROM users;")
+    redactor = ColumnRedactor.from_cursor(cursor, PII_FIELDS)
+
+    count = 0
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            stream.write(formatter.format_batch(
+                map(redactor.format_row, rows), redacted=True))
+            count += len(rows)
+        stream.flush()
+    finally:
+        cursor.close()
+    return count
 
 
 def main() -> None:
     """
     Main function to retrieve and display filtered user data from database.
+    Set PERSONAL_DATA_EXPORT_MODE=stream to use the batched export, with
+    PERSONAL_DATA_EXPORT_BATCH_SIZE rows per batch.
     """
     db = get_db()
+
+    if os.environ.get("PERSONAL_DATA_EXPORT_MODE") == "stream":
+        batch_size = int(os.environ.get("PERSONAL_DATA_EXPORT_BATCH_SIZE",
+                                        EXPORT_BATCH_SIZE))
+        export_users(db, batch_size=batch_size)
+        db.close()
+        return
+
     cursor = db.cursor()
     cursor.execute("SELECT * FROM users;")
 
     logger = get_logger()
+    redactor = ColumnRedactor.from_cursor(cursor, PII_FIELDS)
 
     for row in cursor:
-        message = "name={}; email={}; phone={}; ssn={}; password={}; " \
-                  "ip={}; last_login={}; user_agent={};".format(*row)
-        logger.info(message)
+        logger.info(redactor.format_row(row), extra={"redacted": True})
 
     cursor.close()
     db.close()
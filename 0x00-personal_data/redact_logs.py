@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Module for redacting personal data in existing log files.
+The input file is memory-mapped, split into chunks on line boundaries
+and the chunks are redacted in a process pool with filter_datum
+semantics, keeping the original line order in the output.
+"""
+
+import argparse
+import mmap
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, List, Tuple
+
+from filtered_logger import PII_FIELDS, RedactingFormatter, filter_datum
+
+
+CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def split_chunks(file_path: str,
+                 chunk_size: int = CHUNK_SIZE) -> List[Tuple[int, int]]:
+    """
+    Returns (start, end) byte offsets splitting the file into chunks of
+    about chunk_size bytes, every chunk ending on a line boundary.
+    """
+    chunks = []
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return chunks
+
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            while start < size:
+                end = data.find(b'\n', min(start + chunk_size, size) - 1)
+                end = size if end == -1 else end + 1
+                chunks.append((start, end))
+                start = end
+    return chunks
+
+
+def redact_chunk(file_path: str, start: int, end: int, fields: List[str],
+                 redaction: str, separator: str) -> bytes:
+    """
+    Returns the redacted bytes of the [start, end) range of the file.
+    """
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = data[start:end].decode('utf-8', 'surrogateescape')
+    return filter_datum(fields, redaction, text,
+                        separator).encode('utf-8', 'surrogateescape')
+
+
+def redact_file(file_path: str, output: BinaryIO, fields: List[str],
+                redaction: str = RedactingFormatter.REDACTION,
+                separator: str = RedactingFormatter.SEPARATOR,
+                workers: int = None, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Writes the redacted content of file_path to output, using a pool of
+    workers processes. At most two chunks per worker are in flight, so
+    memory stays bounded. Returns the number of chunks processed.
+    """
+    chunks = split_chunks(file_path, chunk_size)
+    workers = workers or os.cpu_count() or 1
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start, end in chunks:
+            if len(pending) >= 2 * workers:
+                output.write(pending.popleft().result())
+            pending.append(executor.submit(redact_chunk, file_path, start,
+                                           end, fields, redaction,
+                                           separator))
+        while pending:
+            output.write(pending.popleft().result())
+    return len(chunks)
+
+
+def main() -> None:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(
+        description="Redact PII fields in existing log files.")
+    parser.add_argument("input", help="log file to redact")
+    parser.add_argument("output", nargs="?",
+                        help="redacted file to write (default: stdout)")
+    parser.add_argument("--fields", default=",".join(PII_FIELDS),
+                        help="comma separated fields to redact")
+    parser.add_argument("--redaction", default=RedactingFormatter.REDACTION)
+    parser.add_argument("--separator", default=RedactingFormatter.SEPARATOR)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="approximate chunk size in bytes")
+    args = parser.parse_args()
+
+    fields = [field for field in args.fields.split(",") if field]
+    if args.output is None:
+        redact_file(args.input, sys.stdout.buffer, fields, args.redaction,
+                    args.separator, args.workers, args.chunk_size)
+        sys.stdout.flush()
+        return
+
+    with open(args.output, 'wb') as output:
+        redact_file(args.input, output, fields, args.redaction,
+                    args.separator, args.workers, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 Route module for the API
 """
 from os import getenv
+from api.v1.auth.auth import PathMatcher
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
@@ -30,9 +31,18 @@ if auth_type:
     elif auth_type == 'session_db_auth':
         from api.v1.auth.session_db_auth import SessionDBAuth
         auth = SessionDBAuth()
+    elif auth_type == 'signed_session_auth':
+        from api.v1.auth.signed_session_auth import SignedSessionAuth
+        auth = SignedSessionAuth()
 app.register_blueprint(app_views)
 CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 
+# Paths that don't need authentication, compiled once
+excluded_paths = PathMatcher(['/api/v1/status/',
+                              '/api/v1/unauthorized/',
+                              '/api/v1/forbidden/',
+                              '/api/v1/auth_session/login/'])
+
 
 @app.before_request
 def before_request():
@@ -43,12 +53,6 @@ def before_request():
     if auth is None:
         return
 
-    # List of paths that don't need authentication
-    excluded_paths = ['/api/v1/status/',
-                      '/api/v1/unauthorized/',
-                      '/api/v1/forbidden/',
-                      '/api/v1/auth_session/login/']
-
     if not auth.require_auth(request.path, excluded_paths):
         return
 
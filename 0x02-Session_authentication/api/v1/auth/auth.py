@@ -3,42 +3,105 @@
 Authentication module for the API
 """
 import os
+from functools import lru_cache
 from flask import request
-from typing import List, TypeVar
+from typing import Iterable, List, TypeVar, Union
+
+
+class PathMatcher:
+    """
+    Excluded paths compiled once: exact paths in a set, the prefixes of
+    wildcard paths ("/api/v1/stat*") in a trie, so a lookup costs the
+    length of the path whatever the number of excluded paths
+    """
+    # Trie key marking the end of a prefix
+    END = ''
+
+    def __init__(self, excluded_paths: Iterable[str]):
+        """
+        Compile excluded paths
+        Args:
+            excluded_paths: paths that don't need authentication
+        """
+        self.exact = set()
+        self.prefixes = {}
+        for excluded_path in excluded_paths:
+            if excluded_path.endswith('*'):
+                node = self.prefixes
+                for char in excluded_path[:-1]:
+                    node = node.setdefault(char, {})
+                node[self.END] = True
+            elif excluded_path:
+                # Ensure excluded_path ends with '/' for comparison
+                if excluded_path[-1] != '/':
+                    excluded_path = excluded_path + '/'
+                self.exact.add(excluded_path)
+
+    def __bool__(self) -> bool:
+        """
+        False when no path is excluded
+        """
+        return bool(self.exact or self.prefixes)
+
+    def match(self, path: str) -> bool:
+        """
+        Whether path is excluded
+        Args:
+            path: Path to check
+        Returns:
+            True if path is an excluded path or starts with a prefix
+        """
+        # Ensure path ends with '/' for comparison
+        path = path + '/' if path and path[-1] != '/' else path
+        if path in self.exact:
+            return True
+
+        node = self.prefixes
+        for char in path:
+            if self.END in node:
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        return self.END in node
+
+
+@lru_cache(maxsize=32)
+def compile_paths(excluded_paths: tuple) -> PathMatcher:
+    """
+    PathMatcher of a tuple of excluded paths, cached for the callers
+    still passing plain lists to require_auth
+    """
+    return PathMatcher(excluded_paths)
 
 
 class Auth:
     """
     Authentication class for managing API authentication
     """
-    def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
+    def __init__(self):
+        """
+        Read the settings once, instead of on every request
+        """
+        self.session_name = os.getenv('SESSION_NAME')
+
+    def require_auth(self, path: str,
+                     excluded_paths: Union[PathMatcher, List[str]]) -> bool:
         """
         Method to determine if a path requires authentication
         Args:
             path: Path to check
-            excluded_paths: List of paths that don't need authentication
+            excluded_paths: PathMatcher or list of paths that don't need
+                authentication
         Returns:
             True if authentication is required, False otherwise
         """
         if path is None or excluded_paths is None or not excluded_paths:
             return True
 
-        # Ensure path ends with '/' for comparison
-        path = path + '/' if path and path[-1] != '/' else path
-
-        for excluded_path in excluded_paths:
-            # Check for wildcard paths
-            if excluded_path.endswith('*'):
-                prefix = excluded_path[:-1]
-                if path.startswith(prefix):
-                    return False
-            else:
-                # Ensure excluded_path ends with '/' for comparison
-                if excluded_path[-1] != '/':
-                    excluded_path = excluded_path + '/'
-                if path == excluded_path:
-                    return False
-        return True
+        if not isinstance(excluded_paths, PathMatcher):
+            excluded_paths = compile_paths(tuple(excluded_paths))
+        return not excluded_paths.match(path)
 
     def authorization_header(self, request=None) -> str:
         """
@@ -69,8 +132,7 @@ class Auth:
         if request is None:
             return None
 
-        session_name = os.getenv('SESSION_NAME')
-        if session_name is None:
+        if self.session_name is None:
             return None
 
-        return request.cookies.get(session_name)
+        return request.cookies.get(self.session_name)
@@ -3,6 +3,12 @@
 Basic Authentication module for the API
 """
 import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
 from typing import TypeVar
 
 from api.v1.auth.auth import Auth
@@ -13,6 +19,67 @@ class BasicAuth(Auth):
     """
     BasicAuth class that inherits from Auth
     """
+    # Verified credentials: HMAC of the Authorization header ->
+    # (user id, password hash, expiration time)
+    CREDENTIALS_CACHE_TTL = 300
+    CREDENTIALS_CACHE_SIZE = 1024
+    _credentials_cache = OrderedDict()
+    _credentials_cache_key = os.urandom(32)
+    _credentials_cache_lock = threading.Lock()
+
+    def _credentials_cache_digest(self, authorization_header: str) -> bytes:
+        """
+        Returns the keyed HMAC of an Authorization header, so raw
+        credentials are never kept in memory
+        """
+        return hmac.new(self._credentials_cache_key,
+                        authorization_header.encode("utf-8"),
+                        hashlib.sha256).digest()
+
+    def _credentials_cache_get(self, authorization_header: str):
+        """
+        Returns the User verified for this Authorization header, if still
+        cached. Entries are dropped once expired, or when the user was
+        removed or changed email or password since they were cached.
+        Args:
+            authorization_header: Authorization header
+        Returns:
+            User instance or None
+        """
+        key = self._credentials_cache_digest(authorization_header)
+        with self._credentials_cache_lock:
+            entry = self._credentials_cache.get(key)
+            if entry is None:
+                return None
+            if entry[3] < time.monotonic():
+                del self._credentials_cache[key]
+                return None
+            self._credentials_cache.move_to_end(key)
+
+        user = User.get(entry[0])
+        if user is None or user.password != entry[1] or \
+                user.email != entry[2]:
+            with self._credentials_cache_lock:
+                self._credentials_cache.pop(key, None)
+            return None
+        return user
+
+    def _credentials_cache_set(self, authorization_header: str,
+                               user: TypeVar("User")):
+        """
+        Caches the User verified for this Authorization header
+        Args:
+            authorization_header: Authorization header
+            user: User instance matching the header credentials
+        """
+        key = self._credentials_cache_digest(authorization_header)
+        expires_at = time.monotonic() + self.CREDENTIALS_CACHE_TTL
+        with self._credentials_cache_lock:
+            self._credentials_cache[key] = (user.id, user.password,
+                                            user.email, expires_at)
+            self._credentials_cache.move_to_end(key)
+            while len(self._credentials_cache) > self.CREDENTIALS_CACHE_SIZE:
+                self._credentials_cache.popitem(last=False)
 
     def extract_base64_authorization_header(
         self, authorization_header: str
@@ -121,6 +188,8 @@ class BasicAuth(Auth):
     def current_user(self, request=None) -> TypeVar("User"):
         """
         Retrieves the User instance for a request
+        Headers already verified are served from the credentials cache,
+        without decoding or hashing.
 
         Args:
             request: Flask request object
@@ -135,6 +204,10 @@ class BasicAuth(Auth):
         if auth_header is None:
             return None
 
+        user = self._credentials_cache_get(auth_header)
+        if user is not None:
+            return user
+
         base64_auth_header = self.extract_base64_authorization_header(
             auth_header
         )
@@ -153,4 +226,7 @@ class BasicAuth(Auth):
         if user_email is None or user_pwd is None:
             return None
 
-        return self.user_object_from_credentials(user_email, user_pwd)
+        user = self.user_object_from_credentials(user_email, user_pwd)
+        if user is not None:
+            self._credentials_cache_set(auth_header, user)
+        return user
@@ -4,13 +4,14 @@ Session Authentication module for the API
 """
 import uuid
 from api.v1.auth.auth import Auth
+from api.v1.auth.session_store import new_session_store
 
 
 class SessionAuth(Auth):
     """
     SessionAuth class that inherits from Auth
     """
-    user_id_by_session_id = {}
+    user_id_by_session_id = new_session_store()
 
     def create_session(self, user_id: str = None) -> str:
         """
@@ -98,9 +99,5 @@ class SessionAuth(Auth):
         if user_id is None:
             return False
 
-        # Delete the session ID from the dictionary
-        if session_id in self.user_id_by_session_id:
-            del self.user_id_by_session_id[session_id]
-            return True
-
-        return False
+        # Delete the session ID from the store
+        return self.user_id_by_session_id.pop(session_id, None) is not None
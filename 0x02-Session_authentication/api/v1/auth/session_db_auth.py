@@ -2,7 +2,11 @@
 """
 Session Database Authentication module for the API
 """
+import uuid
+from datetime import datetime, timedelta
+import models.base
 from api.v1.auth.session_exp_auth import SessionExpAuth
+from api.v1.auth.session_store import SESSION_STORE, new_session_store
 from models.user_session import UserSession
 
 
@@ -10,6 +14,19 @@ class SessionDBAuth(SessionExpAuth):
     """
     SessionDBAuth class that stores sessions in database
     """
+    # Session ID -> (user_id, created_at) of the stored UserSession
+    session_cache = new_session_store('session_cache')
+
+    def __init__(self):
+        """
+        Initialize SessionDBAuth
+        The cache is only used when every process sharing the sessions
+        sees its invalidations: with SESSION_STORE=shared, or when the
+        UserSession records are private to this process
+        """
+        super().__init__()
+        self.cache_sessions = SESSION_STORE == 'shared' or (
+            not models.base.SHARED and models.base.STORAGE is None)
 
     def create_session(self, user_id: str = None) -> str:
         """
@@ -25,17 +42,38 @@ class SessionDBAuth(SessionExpAuth):
         if not isinstance(user_id, str):
             return None
 
-        # Generate a Session ID using parent class
-        session_id = super().create_session(user_id)
-        if session_id is None:
-            return None
+        # Generate a Session ID, the session itself lives in database
+        session_id = str(uuid.uuid4())
 
         # Create and save UserSession instance
         user_session = UserSession(user_id=user_id, session_id=session_id)
         user_session.save()
 
+        self.cache_session(session_id, user_id, user_session.created_at)
         return session_id
 
+    def cache_session(self, session_id: str, user_id: str,
+                      created_at: datetime) -> bool:
+        """
+        Cache a session until it expires
+        Args:
+            session_id: Session ID
+            user_id: User ID
+            created_at: creation time of the session, naive UTC
+        Returns:
+            False if the session has already expired
+        """
+        if not self.cache_sessions:
+            return True
+        ttl = 0
+        if self.session_duration > 0:
+            ttl = (created_at + timedelta(seconds=self.session_duration) -
+                   datetime.utcnow()).total_seconds()
+            if ttl <= 0:
+                return False
+        self.session_cache.set(session_id, (user_id, created_at), ttl=ttl)
+        return True
+
     def user_id_for_session_id(self, session_id: str = None) -> str:
         """
         Returns the User ID by requesting UserSession in the database
@@ -50,16 +88,30 @@ class SessionDBAuth(SessionExpAuth):
         if not isinstance(session_id, str):
             return None
 
-        try:
-            # Search for UserSession by session_id
-            user_sessions = UserSession.search({'session_id': session_id})
+        entry = None
+        if self.cache_sessions:
+            entry = self.session_cache.get(session_id)
+        if entry is None:
+            try:
+                # Search for UserSession by session_id
+                user_sessions = UserSession.search(
+                    {'session_id': session_id})
+            except Exception:
+                return None
             if not user_sessions or len(user_sessions) == 0:
                 return None
 
             user_session = user_sessions[0]
-            return user_session.user_id
-        except Exception:
+            entry = (user_session.user_id, user_session.created_at)
+            if not self.cache_session(session_id, *entry):
+                return None
+
+        user_id, created_at = entry
+        # The cache expires on a monotonic clock, check the wall clock too
+        if self.session_duration > 0 and datetime.utcnow() > \
+                created_at + timedelta(seconds=self.session_duration):
             return None
+        return user_id
 
     def destroy_session(self, request=None) -> bool:
         """
@@ -77,6 +129,7 @@ class SessionDBAuth(SessionExpAuth):
         if session_id is None:
             return False
 
+        self.session_cache.pop(session_id, None)
         try:
             # Search for UserSession by session_id
             user_sessions = UserSession.search({'session_id': session_id})
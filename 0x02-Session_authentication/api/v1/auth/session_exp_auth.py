@@ -40,8 +40,9 @@ class SessionExpAuth(SessionAuth):
             'created_at': datetime.now()
         }
 
-        # Store the session dictionary
-        self.user_id_by_session_id[session_id] = session_dict
+        # Store the session dictionary, evicted once expired
+        self.user_id_by_session_id.set(session_id, session_dict,
+                                       ttl=max(self.session_duration, 0))
 
         return session_id
 
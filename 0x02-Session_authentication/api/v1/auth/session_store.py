@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Session store module for the API
+Bounded, thread-safe and self-expiring mapping of Session IDs
+"""
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from os import getenv
+from typing import Dict
+
+
+# Maximum number of live sessions, least recently used ones are evicted
+SESSION_STORE_CAPACITY = int(getenv('SESSION_STORE_CAPACITY', '100000'))
+# Number of independently locked stripes
+SESSION_STORE_STRIPES = int(getenv('SESSION_STORE_STRIPES', '16'))
+# Seconds between two purges of the expired sessions, 0 to purge only
+# when a stripe is written to
+SESSION_STORE_PURGE_INTERVAL = float(
+    getenv('SESSION_STORE_PURGE_INTERVAL', '60'))
+# "shared" to share the sessions between the worker processes of the node
+# through the SQLite database SESSION_STORE_PATH
+SESSION_STORE = getenv('SESSION_STORE', 'memory')
+SESSION_STORE_PATH = getenv('SESSION_STORE_PATH', '.sessions.sqlite3')
+
+_MISSING = object()
+
+
+class _Stripe:
+    """
+    One stripe of a SessionStore: entries in LRU order and a min-heap of
+    expiry times, guarded by a lock
+    """
+    __slots__ = ('lock', 'entries', 'expiries', 'capacity',
+                 'evictions', 'expirations')
+
+    def __init__(self, capacity: int):
+        """
+        Initialize an empty stripe
+        """
+        self.lock = threading.Lock()
+        # key -> (value, expiry time or None), least recently used first
+        self.entries = OrderedDict()
+        # (expiry time, key), entries replaced since are skipped on pop
+        self.expiries = []
+        self.capacity = capacity
+        self.evictions = 0
+        self.expirations = 0
+
+    def purge(self, now: float):
+        """
+        Remove the expired entries, the lock must be held
+        """
+        expiries = self.expiries
+        while expiries and expiries[0][0] <= now:
+            expires_at, key = heapq.heappop(expiries)
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] == expires_at:
+                del self.entries[key]
+                self.expirations += 1
+
+
+class SessionStore:
+    """
+    Dict-like store of sessions with a capacity, LRU eviction and
+    per-entry expiry on a monotonic clock
+    Keys are spread over stripes, each with its own lock, LRU order and
+    expiry heap, so concurrent requests rarely wait on each other
+    """
+
+    def __init__(self, capacity: int = SESSION_STORE_CAPACITY,
+                 ttl: float = 0, stripes: int = SESSION_STORE_STRIPES,
+                 purge_interval: float = SESSION_STORE_PURGE_INTERVAL):
+        """
+        Initialize an empty store
+        Args:
+            capacity: maximum number of entries, 0 for no limit
+            ttl: default time to live in seconds, 0 for no expiry
+            stripes: number of stripes
+            purge_interval: seconds between two purges of all stripes
+        """
+        stripes = max(1, stripes)
+        per_stripe = -(-capacity // stripes) if capacity > 0 else 0
+        self.stripes = [_Stripe(per_stripe) for i in range(stripes)]
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.purger = None
+        self.purger_lock = threading.Lock()
+
+    def stripe(self, key) -> _Stripe:
+        """
+        Stripe holding key
+        """
+        return self.stripes[hash(key) % len(self.stripes)]
+
+    def set(self, key, value, ttl: float = None):
+        """
+        Store value under key
+        Args:
+            key: Session ID
+            value: session data
+            ttl: time to live in seconds, the store default if None,
+                0 for no expiry
+        """
+        if ttl is None:
+            ttl = self.ttl
+        now = time.monotonic()
+        expires_at = now + ttl if ttl > 0 else None
+        stripe = self.stripe(key)
+        with stripe.lock:
+            stripe.purge(now)
+            stripe.entries[key] = (value, expires_at)
+            stripe.entries.move_to_end(key)
+            if expires_at is not None:
+                heapq.heappush(stripe.expiries, (expires_at, key))
+            while stripe.capacity and len(stripe.entries) > stripe.capacity:
+                stripe.entries.popitem(last=False)
+                stripe.evictions += 1
+        if expires_at is not None and self.purger is None:
+            self.start_purger()
+
+    def get(self, key, default=None):
+        """
+        Value of key, or default if missing or expired
+        """
+        stripe = self.stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            if entry is None:
+                return default
+            if entry[1] is not None and entry[1] <= time.monotonic():
+                del stripe.entries[key]
+                stripe.expirations += 1
+                return default
+            stripe.entries.move_to_end(key)
+            return entry[0]
+
+    def pop(self, key, default=_MISSING):
+        """
+        Remove key and return its value
+        """
+        stripe = self.stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.pop(key, None)
+        if entry is None or (entry[1] is not None and
+                             entry[1] <= time.monotonic()):
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        return entry[0]
+
+    def __getitem__(self, key):
+        """
+        Value of key, KeyError if missing or expired
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        """
+        Store value under key with the default time to live
+        """
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        """
+        Remove key
+        """
+        self.pop(key)
+
+    def __contains__(self, key) -> bool:
+        """
+        Whether key is live
+        """
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        """
+        Number of live sessions
+        """
+        self.purge()
+        return sum(len(stripe.entries) for stripe in self.stripes)
+
+    def clear(self):
+        """
+        Remove all entries
+        """
+        for stripe in self.stripes:
+            with stripe.lock:
+                stripe.entries.clear()
+                stripe.expiries.clear()
+
+    def purge(self):
+        """
+        Remove the expired entries of every stripe
+        """
+        now = time.monotonic()
+        for stripe in self.stripes:
+            with stripe.lock:
+                stripe.purge(now)
+
+    def start_purger(self):
+        """
+        Start the thread purging the expired entries every
+        purge_interval seconds
+        """
+        if self.purge_interval <= 0:
+            return
+
+        def _purge_loop():
+            while True:
+                time.sleep(self.purge_interval)
+                self.purge()
+
+        with self.purger_lock:
+            if self.purger is not None:
+                return
+            self.purger = threading.Thread(target=_purge_loop, daemon=True)
+            self.purger.start()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Counters of the store: live sessions, evictions and expirations
+        """
+        live = len(self)
+        return {
+            'live': live,
+            'evictions': sum(stripe.evictions for stripe in self.stripes),
+            'expirations': sum(stripe.expirations
+                               for stripe in self.stripes),
+        }
+
+
+def new_session_store(table: str = 'sessions',
+                      capacity: int = SESSION_STORE_CAPACITY):
+    """
+    Session store selected by SESSION_STORE: a SessionStore, private to
+    the process, or a SharedSessionStore using table
+    Args:
+        table: table of the shared store
+        capacity: maximum number of entries, 0 for no limit
+    """
+    if SESSION_STORE == 'shared':
+        from api.v1.auth.shared_session_store import SharedSessionStore
+        return SharedSessionStore(SESSION_STORE_PATH, table,
+                                  capacity=capacity)
+    return SessionStore(capacity=capacity)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Shared session store module for the API
+Sessions in a local SQLite database in WAL mode, so every worker process
+of the node sees the same sessions
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict
+
+from api.v1.auth.session_store import (SESSION_STORE_CAPACITY,
+                                       SESSION_STORE_PURGE_INTERVAL)
+
+
+_MISSING = object()
+
+
+def _encode(obj):
+    """ JSON encoding of the datetimes held by sessions
+    """
+    if isinstance(obj, datetime):
+        return {'$datetime': obj.isoformat()}
+    raise TypeError("{} is not JSON serializable".format(type(obj)))
+
+
+def _decode(obj: dict):
+    """ JSON decoding of the datetimes held by sessions
+    """
+    if len(obj) == 1 and '$datetime' in obj:
+        return datetime.fromisoformat(obj['$datetime'])
+    return obj
+
+
+class SharedSessionStore:
+    """
+    Dict-like store of sessions shared by the processes using the same
+    database file, with the interface of SessionStore
+    Readers never wait for writers (WAL mode); expiry uses the wall clock,
+    and the capacity is enforced by the purge, oldest sessions first
+    """
+
+    def __init__(self, file_path: str, table: str = 'sessions',
+                 capacity: int = SESSION_STORE_CAPACITY, ttl: float = 0,
+                 purge_interval: float = SESSION_STORE_PURGE_INTERVAL):
+        """
+        Initialize the store on a database file
+        Args:
+            file_path: SQLite database file
+            table: table of the sessions
+            capacity: maximum number of entries, 0 for no limit
+            ttl: default time to live in seconds, 0 for no expiry
+            purge_interval: seconds between two purges
+        """
+        self.file_path = file_path
+        self.table = table
+        self.capacity = capacity
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.local = threading.local()
+        self.last_purge = 0
+        table = '"{}"'.format(table)
+        self.sql = {
+            'set': "INSERT OR REPLACE INTO {} (id, value, expires_at) "
+                   "VALUES (?, ?, ?)".format(table),
+            'get': "SELECT value, expires_at FROM {} "
+                   "WHERE id = ?".format(table),
+            'delete': "DELETE FROM {} WHERE id = ?".format(table),
+            'count': "SELECT COUNT(*) FROM {} WHERE expires_at IS NULL "
+                     "OR expires_at > ?".format(table),
+            'clear': "DELETE FROM {}".format(table),
+            'expire': "DELETE FROM {} WHERE expires_at <= ?".format(table),
+            'evict': "DELETE FROM {0} WHERE rowid IN (SELECT rowid FROM {0} "
+                     "ORDER BY rowid LIMIT max(0, (SELECT COUNT(*) FROM {0})"
+                     " - ?))".format(table),
+            'stats': "SELECT name, value FROM session_stats "
+                     "WHERE name IN (?, ?)",
+            'count_stat': "INSERT INTO session_stats (name, value) "
+                          "VALUES (?, ?) ON CONFLICT(name) "
+                          "DO UPDATE SET value = value + excluded.value",
+        }
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """ Connection of the current thread, reopened after a fork
+        """
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.file_path, timeout=30,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS "{}" (id TEXT PRIMARY KEY, '
+                'value TEXT NOT NULL, expires_at REAL)'.format(self.table))
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS "{0}_expires_at" '
+                'ON "{0}" (expires_at)'.format(self.table))
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS session_stats "
+                "(name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    def set(self, key: str, value, ttl: float = None):
+        """
+        Store value under key
+        Args:
+            key: Session ID
+            value: session data, JSON serializable
+            ttl: time to live in seconds, the store default if None,
+                0 for no expiry
+        """
+        if ttl is None:
+            ttl = self.ttl
+        now = time.time()
+        expires_at = now + ttl if ttl > 0 else None
+        self.connection.execute(
+            self.sql['set'],
+            (key, json.dumps(value, default=_encode), expires_at))
+        if now - self.last_purge >= self.purge_interval:
+            self.purge()
+
+    def get(self, key: str, default=None):
+        """
+        Value of key, or default if missing or expired
+        """
+        row = self.connection.execute(self.sql['get'], (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return default
+        return json.loads(row[0], object_hook=_decode)
+
+    def pop(self, key: str, default=_MISSING):
+        """
+        Remove key and return its value
+        """
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(self.sql['get'], (key,)).fetchone()
+            connection.execute(self.sql['delete'], (key,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        return json.loads(row[0], object_hook=_decode)
+
+    def __getitem__(self, key: str):
+        """
+        Value of key, KeyError if missing or expired
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value):
+        """
+        Store value under key with the default time to live
+        """
+        self.set(key, value)
+
+    def __delitem__(self, key: str):
+        """
+        Remove key
+        """
+        self.pop(key)
+
+    def __contains__(self, key: str) -> bool:
+        """
+        Whether key is live
+        """
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        """
+        Number of live sessions
+        """
+        return self.connection.execute(self.sql['count'],
+                                       (time.time(),)).fetchone()[0]
+
+    def clear(self):
+        """
+        Remove all entries
+        """
+        self.connection.execute(self.sql['clear'])
+
+    def purge(self):
+        """
+        Remove the expired entries, then the oldest ones over capacity
+        """
+        self.last_purge = time.time()
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            expirations = connection.execute(
+                self.sql['expire'], (self.last_purge,)).rowcount
+            evictions = 0
+            if self.capacity > 0:
+                evictions = connection.execute(
+                    self.sql['evict'], (self.capacity,)).rowcount
+            for name, count in (('expirations', expirations),
+                                ('evictions', evictions)):
+                if count > 0:
+                    connection.execute(
+                        self.sql['count_stat'],
+                        ("{}.{}".format(self.table, name), count))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Counters of the store, across all processes: live sessions,
+        evictions and expirations
+        """
+        result = {'live': len(self), 'evictions': 0, 'expirations': 0}
+        for name, value in self.connection.execute(
+                self.sql['stats'], (self.table + ".evictions",
+                                    self.table + ".expirations")):
+            result[name.split(".", 1)[1]] = value
+        return result
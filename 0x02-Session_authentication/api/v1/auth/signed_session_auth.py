@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Signed Session Authentication module for the API
+The session cookie carries the user ID, the issue time and an HMAC, so
+it is verified without any session store
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import logging
+import os
+import time
+from typing import Dict, Tuple
+from api.v1.auth.session_exp_auth import SessionExpAuth
+from api.v1.auth.session_store import SESSION_STORE, new_session_store
+
+
+def _b64encode(data: bytes) -> str:
+    """ Unpadded base64url encoding
+    """
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    """ Decoding of _b64encode, binascii.Error if invalid
+    """
+    return base64.b64decode(data + "=" * (-len(data) % 4), altchars=b"-_",
+                            validate=True)
+
+
+def parse_keys(value: str) -> Tuple[str, Dict[str, bytes]]:
+    """
+    Parse signing keys from "kid:secret,kid:secret"
+    Args:
+        value: keys, the first one signs new tokens
+    Returns:
+        ID of the active key and secrets by key ID
+    """
+    keys = {}
+    active = None
+    for item in (value or "").split(","):
+        kid, sep, secret = item.strip().partition(":")
+        if not sep or not kid or not secret or "." in kid:
+            continue
+        keys[kid] = secret.encode()
+        if active is None:
+            active = kid
+    return active, keys
+
+
+class SignedSessionAuth(SessionExpAuth):
+    """
+    SignedSessionAuth class issuing HMAC-signed session tokens
+    Token: <kid>.<user ID>.<issued at>.<signature>, signed with the key
+    kid of SESSION_SECRET_KEYS; older keys still verify tokens, which
+    allows rotation. Logged out tokens are kept in a revocation list
+    until they expire, which requires a positive SESSION_DURATION
+    With several worker processes, every worker needs the same
+    SESSION_SECRET_KEYS and SESSION_STORE=shared, otherwise a logout is
+    only seen by the worker that handled it
+    """
+    # Signature of revoked token -> True, never evicted: entries only
+    # leave once their token has expired
+    revoked_sessions = new_session_store('revoked_sessions', capacity=0)
+
+    def __init__(self):
+        """
+        Initialize SignedSessionAuth with the keys of SESSION_SECRET_KEYS
+        """
+        super().__init__()
+        if self.session_duration <= 0:
+            raise ValueError("signed_session_auth requires a positive "
+                             "SESSION_DURATION")
+        self.active_kid, self.keys = parse_keys(
+            os.getenv('SESSION_SECRET_KEYS'))
+        if self.active_kid is None:
+            raise ValueError("signed_session_auth requires "
+                             "SESSION_SECRET_KEYS (\"kid:secret,...\")")
+        if SESSION_STORE != 'shared':
+            logging.getLogger(__name__).warning(
+                "signed_session_auth without SESSION_STORE=shared: "
+                "logouts only apply to this worker process")
+
+    def sign(self, kid: str, payload: str) -> str:
+        """
+        Signature of payload with the key kid
+        """
+        return _b64encode(hmac.new(self.keys[kid],
+                                   payload.encode('utf-8', 'surrogateescape'),
+                                   hashlib.sha256).digest())
+
+    def create_session(self, user_id: str = None) -> str:
+        """
+        Creates a signed session token for a user_id
+        Args:
+            user_id: User ID
+        Returns:
+            Session token or None
+        """
+        if user_id is None or not isinstance(user_id, str):
+            return None
+
+        payload = "{}.{}.{}".format(self.active_kid,
+                                    _b64encode(user_id.encode()),
+                                    int(time.time()))
+        return "{}.{}".format(payload, self.sign(self.active_kid, payload))
+
+    def verify(self, session_id: str) -> Tuple[str, int, str]:
+        """
+        Check a session token
+        Args:
+            session_id: Session token
+        Returns:
+            User ID, issue time and signature, or None if the token is
+            invalid, expired or revoked
+        """
+        if session_id is None or not isinstance(session_id, str):
+            return None
+
+        payload, sep, signature = session_id.rpartition(".")
+        parts = payload.split(".")
+        if not sep or len(parts) != 3 or parts[0] not in self.keys:
+            return None
+        # Bytes, compare_digest rejects non-ASCII strings
+        if not hmac.compare_digest(
+                signature.encode('utf-8', 'surrogateescape'),
+                self.sign(parts[0], payload).encode()):
+            return None
+
+        try:
+            user_id = _b64decode(parts[1]).decode()
+            issued_at = int(parts[2])
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None
+        if time.time() > issued_at + self.session_duration:
+            return None
+        if signature in self.revoked_sessions:
+            return None
+        return user_id, issued_at, signature
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """
+        Returns the User ID of a valid session token
+        Args:
+            session_id: Session token
+        Returns:
+            User ID or None
+        """
+        session = self.verify(session_id)
+        if session is None:
+            return None
+        return session[0]
+
+    def destroy_session(self, request=None) -> bool:
+        """
+        Revokes the session token of the request cookie
+        Args:
+            request: Flask request object
+        Returns:
+            True if session was destroyed, False otherwise
+        """
+        if request is None:
+            return False
+
+        session = self.verify(self.session_cookie(request))
+        if session is None:
+            return False
+
+        user_id, issued_at, signature = session
+        # Revoked until the token expires by itself
+        ttl = max(issued_at + self.session_duration - time.time(), 1)
+        self.revoked_sessions.set(signature, True, ttl=ttl)
+        return True
@@ -2,7 +2,6 @@
 """
 Session authentication views
 """
-import os
 from api.v1.views import app_views
 from flask import abort, jsonify, request, make_response
 from models.user import User
@@ -44,9 +43,8 @@ def session_login():
     response = make_response(jsonify(user.to_json()))
 
     # Set cookie
-    session_name = os.getenv('SESSION_NAME')
-    if session_name:
-        response.set_cookie(session_name, session_id)
+    if auth.session_name:
+        response.set_cookie(auth.session_name, session_id)
 
     return response
 
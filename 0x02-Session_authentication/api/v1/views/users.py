@@ -1,19 +1,96 @@
 #!/usr/bin/env python3
 """ Module of Users views
 """
+import base64
+import binascii
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request, stream_with_context
 from models.user import User
 
 
+def encode_cursor(user_id: str) -> str:
+    """ Opaque cursor pointing after user_id
+    """
+    return base64.urlsafe_b64encode(user_id.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """ User ID of an opaque cursor, None if invalid
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        return base64.b64decode(cursor + padding, altchars=b"-_",
+                                validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def json_response(body: str, status: int = 200) -> Response:
+    """ Response of an already serialized JSON body
+    """
+    return Response(body + "\n", status=status, mimetype="application/json")
+
+
+def users_response(users) -> Response:
+    """ Response of the JSON array of users, built from their cached
+    JSON fragments
+    """
+    return json_response(
+        "[" + ", ".join(user.to_json_fragment() for user in users) + "]")
+
+
+def stream_users(users) -> Response:
+    """ Response writing the JSON array of users incrementally
+    """
+    def generate():
+        yield "["
+        for i, user in enumerate(users):
+            yield ("," if i else "") + user.to_json_fragment()
+        yield "]"
+    return Response(stream_with_context(generate()),
+                    mimetype="application/json")
+
+
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters:
+      - limit (optional): maximum number of users, ordered by ID
+      - cursor (optional): X-Next-Cursor of the previous page
+      - stream (optional): 1 to stream the JSON array
     Return:
       - list of all User objects JSON represented
+      - the cursor of the next page in the X-Next-Cursor header
+      - 400 if limit or cursor is invalid
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    stream = request.args.get('stream') == "1"
+    if limit is None and cursor is None:
+        if stream:
+            return stream_users(User.iterate())
+        return users_response(User.all())
+
+    after = None
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        if after is None:
+            return jsonify({'error': "Wrong cursor"}), 400
+    try:
+        limit = int(limit) if limit is not None else 100
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        return jsonify({'error': "Wrong limit"}), 400
+
+    users = User.page(limit, after)
+    if stream:
+        response = stream_users(users)
+    else:
+        response = users_response(users)
+    if len(users) == limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(users[-1].id)
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -32,12 +109,12 @@ def view_one_user(user_id: str = None) -> str:
     if user_id == "me":
         if request.current_user is None:
             abort(404)
-        return jsonify(request.current_user.to_json())
+        return json_response(request.current_user.to_json_fragment())
 
     user = User.get(user_id)
     if user is None:
         abort(404)
-    return jsonify(user.to_json())
+    return json_response(user.to_json_fragment())
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'], strict_slashes=False)
@@ -90,7 +167,7 @@ def create_user() -> str:
             user.first_name = rj.get("first_name")
             user.last_name = rj.get("last_name")
             user.save()
-            return jsonify(user.to_json()), 201
+            return json_response(user.to_json_fragment(), 201)
         except Exception as e:
             error_msg = "Can't create User: {}".format(e)
     return jsonify({'error': error_msg}), 400
@@ -126,4 +203,4 @@ def update_user(user_id: str = None) -> str:
     if rj.get('last_name') is not None:
         user.last_name = rj.get('last_name')
     user.save()
-    return jsonify(user.to_json()), 200
+    return json_response(user.to_json_fragment(), 200)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+""" Memory benchmark of the models representation
+Compares the bytes per object of the __slots__ based User and UserSession
+with the previous representation: a per-instance __dict__ holding two
+datetime objects
+"""
+import argparse
+import gc
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from models.user import User
+from models.user_session import UserSession
+
+
+class LegacyUser():
+    """ User as represented before __slots__: __dict__ and datetimes
+    """
+
+    def __init__(self, **kwargs):
+        """ Initialize a LegacyUser instance
+        """
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+        self.email = kwargs.get('email')
+        self._password = kwargs.get('_password')
+        self.first_name = kwargs.get('first_name')
+        self.last_name = kwargs.get('last_name')
+
+
+class LegacyUserSession():
+    """ UserSession as represented before __slots__
+    """
+
+    def __init__(self, **kwargs):
+        """ Initialize a LegacyUserSession instance
+        """
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+        self.user_id = kwargs.get('user_id')
+        self.session_id = kwargs.get('session_id')
+
+
+def bytes_per_object(factory, count: int) -> float:
+    """ Average memory allocated per object built by factory(i)
+    The attribute values are allocated before measuring, so only the
+    objects themselves are counted
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [factory(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Remove the list holding the objects
+    overhead = objs.__sizeof__()
+    del objs
+    return (after - before - overhead) / count
+
+
+def main():
+    """ Print bytes per object before and after
+    """
+    parser = argparse.ArgumentParser(
+        description="Bytes per object of the models representation")
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+
+    emails = ["user{}@example.com".format(i) for i in range(args.count)]
+    passwords = ["{:064x}".format(i) for i in range(args.count)]
+    session_ids = [str(uuid.uuid4()) for i in range(args.count)]
+
+    def user(klass):
+        return lambda i: klass(email=emails[i], _password=passwords[i],
+                               first_name="Bob", last_name="Dylan")
+
+    def user_session(klass):
+        return lambda i: klass(user_id=emails[i], session_id=session_ids[i])
+
+    for name, legacy, compact in (
+            ("User", user(LegacyUser), user(User)),
+            ("UserSession", user_session(LegacyUserSession),
+             user_session(UserSession))):
+        before = bytes_per_object(legacy, args.count)
+        after = bytes_per_object(compact, args.count)
+        print("{:<12} before: {:7.1f} B/object  after: {:7.1f} B/object"
+              "  ({:.0%})".format(name, before, after, after / before))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,272 @@
 #!/usr/bin/env python3
 """ Base module
 """
-from datetime import datetime
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from typing import TypeVar, List, Iterable
-from os import path
+from os import getenv, path
+import atexit
+import calendar
+import fcntl
 import json
+import os
+import shutil
+import tempfile
+import threading
+import time
 import uuid
 
+from models.snapshot import Snapshot, SnapshotRecord, write_snapshot
+
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+EPOCH = datetime(1970, 1, 1)
+UNSET = object()
 DATA = {}
+INDEX_DATA = {}
+# Sorted IDs of each class, for pagination, built on first use
+ORDERS = {}
+
+# Append-only journal: save/remove append the changed object to
+# .db_<Class>.journal, compacted into .db_<Class>.json in the background
+# once it holds more than JOURNAL_THRESHOLD entries
+JOURNAL = getenv('BASE_JOURNAL', '0') == '1'
+JOURNAL_THRESHOLD = int(getenv('BASE_JOURNAL_THRESHOLD', '1000'))
+JOURNAL_SIZES = {}
+COMPACTIONS = {}
+LOCK = threading.RLock()
+
+# Deferred persistence: inside Base.batch(), or always when write-behind
+# is enabled (BASE_WRITE_BEHIND=<seconds>), save/remove only mark their
+# class dirty and Base.flush() writes each dirty class once
+WRITE_BEHIND = float(getenv('BASE_WRITE_BEHIND', '0'))
+DIRTY = {}
+# Base.batch() nesting depth of each thread, in BATCH.depth
+BATCH = threading.local()
+FLUSH_LOCK = threading.Lock()
+FLUSHER = None
+
+# Lazy loading (BASE_LAZY_LOAD=1): load_from_file keeps the parsed JSON
+# records in DATA and objects are only built when get, search or all
+# return them
+LAZY_LOAD = getenv('BASE_LAZY_LOAD', '0') == '1'
+
+# Binary snapshots (see models.snapshot): load_from_file reads
+# .db_<Class>.snap instead of the JSON file when it is at least as
+# recent, with BASE_SNAPSHOT=1 save_to_file keeps it up to date
+SNAPSHOT = getenv('BASE_SNAPSHOT', '0') == '1'
+
+# Alternative storage engine (see models.storage), selected at the end of
+# this module from BASE_STORAGE; None keeps DATA and the JSON files
+STORAGE = None
+
+# Several processes sharing the files (BASE_SHARED=1): writes hold an
+# exclusive lock on .db_<Class>.lock and increment the generation counter
+# stored in it; before reads a class is reloaded if that generation
+# changed. Writes are never deferred in this mode.
+SHARED = getenv('BASE_SHARED', '0') == '1'
+GENERATIONS = {}
+# Digits of the generation counter in the lock file
+GENERATION_WIDTH = 20
+HELD_LOCKS = threading.local()
+
+
+def parse_timestamp(value: str) -> int:
+    """ Convert a TIMESTAMP_FORMAT string to seconds since the epoch
+    """
+    if len(value) == 19 and value[10] == 'T':
+        return calendar.timegm((int(value[0:4]), int(value[5:7]),
+                                int(value[8:10]), int(value[11:13]),
+                                int(value[14:16]), int(value[17:19])))
+    return to_timestamp(datetime.strptime(value, TIMESTAMP_FORMAT))
+
+
+def format_timestamp(value: int) -> str:
+    """ Convert seconds since the epoch to a TIMESTAMP_FORMAT string
+    """
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(value))
+
+
+def to_timestamp(value: datetime) -> int:
+    """ Convert a naive UTC datetime to seconds since the epoch
+    """
+    return calendar.timegm(value.utctimetuple())
+
+
+@contextmanager
+def file_lock(s_class: str, exclusive: bool = True):
+    """ Hold the inter-process lock of a class in shared mode
+    Re-entrant within a thread
+    """
+    held = getattr(HELD_LOCKS, 'classes', None)
+    if held is None:
+        held = HELD_LOCKS.classes = set()
+    if not SHARED or s_class in held:
+        yield
+        return
+
+    with open(".db_{}.lock".format(s_class), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        held.add(s_class)
+        try:
+            yield
+        finally:
+            held.discard(s_class)
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def file_generation(s_class: str) -> int:
+    """ Current generation of a class: counter stored in its lock file,
+    0 if there is none yet
+    """
+    try:
+        fd = os.open(".db_{}.lock".format(s_class), os.O_RDONLY)
+    except FileNotFoundError:
+        return 0
+    try:
+        value = os.pread(fd, GENERATION_WIDTH, 0)
+    finally:
+        os.close(fd)
+    return int(value) if value.strip() else 0
+
+
+def bump_generation(s_class: str):
+    """ Advance the generation of a class after a write, under the
+    exclusive lock of the class
+    The counter is written in place with a fixed width, so concurrent
+    readers see either the old or the new value
+    """
+    generation = file_generation(s_class) + 1
+    fd = os.open(".db_{}.lock".format(s_class), os.O_WRONLY | os.O_CREAT,
+                 0o644)
+    try:
+        os.pwrite(fd, str(generation).rjust(GENERATION_WIDTH).encode(), 0)
+    finally:
+        os.close(fd)
+    GENERATIONS[s_class] = generation
+
+
+def write_json_atomic(file_path: str, fragments: Iterable[tuple]):
+    """ Write the JSON object of fragments ((key, serialized value) pairs)
+    to file_path through a temporary file and a rename, so readers never
+    see a partially written file
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=path.dirname(file_path) or '.',
+                                    prefix=path.basename(file_path),
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write("{")
+            for i, (key, fragment) in enumerate(fragments):
+                f.write("{}{}: {}".format(", " if i else "",
+                                          json.dumps(key), fragment))
+            f.write("}")
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class Index():
+    """ Hash index of object IDs by attribute values
+    """
+
+    def __init__(self, attributes: Iterable[str]):
+        """ Initialize an empty index on attributes
+        """
+        self.attributes = tuple(attributes)
+        self.buckets = {attribute: {} for attribute in self.attributes}
+        self.values = {}
+
+    def add(self, obj_id: str, values: tuple):
+        """ Index obj_id under values (one per indexed attribute)
+        """
+        if self.values.get(obj_id) == values:
+            return
+        self.discard(obj_id)
+        self.values[obj_id] = values
+        for attribute, value in zip(self.attributes, values):
+            try:
+                self.buckets[attribute].setdefault(value, {})[obj_id] = True
+            except TypeError:
+                pass
+
+    def add_all(self, obj_ids: Iterable[str], values: Iterable[tuple]):
+        """ Index each of obj_ids under its values, one attribute at a
+        time: much faster than add for a bulk load
+        """
+        pairs = []
+        for obj_id, obj_values in zip(obj_ids, values):
+            if obj_id in self.values:
+                self.discard(obj_id)
+            self.values[obj_id] = obj_values
+            pairs.append((obj_id, obj_values))
+        for position, attribute in enumerate(self.attributes):
+            buckets = self.buckets[attribute]
+            for obj_id, obj_values in pairs:
+                try:
+                    buckets.setdefault(obj_values[position], {})[obj_id] = \
+                        True
+                except TypeError:
+                    pass
+
+    def discard(self, obj_id: str):
+        """ Remove obj_id from the index
+        """
+        values = self.values.pop(obj_id, None)
+        if values is None:
+            return
+        for attribute, value in zip(self.attributes, values):
+            try:
+                bucket = self.buckets[attribute].get(value)
+            except TypeError:
+                continue
+            if bucket is not None:
+                bucket.pop(obj_id, None)
+                if len(bucket) == 0:
+                    del self.buckets[attribute][value]
+
+    def lookup(self, attributes: dict) -> Iterable[str]:
+        """ Return the IDs matching the first indexed attribute of the
+        filter, or None if no attribute of the filter is indexed
+        """
+        for attribute, value in attributes.items():
+            buckets = self.buckets.get(attribute)
+            if buckets is None:
+                continue
+            try:
+                return list(buckets.get(value, ()))
+            except TypeError:
+                continue
+        return None
 
 
 class Base():
     """ Base class
+    Attributes live in __slots__ and timestamps are stored as integer
+    seconds since the epoch; subclasses declare their own __slots__
     """
+    __slots__ = ('id', '_created_at', '_updated_at', '_fragments')
+    # Attributes with a secondary index, used by search
+    INDEXES = ()
+    # Slots of the subclasses, in declaration order, serialized by to_json
+    FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        """ Collect the slots declared by the subclasses into FIELDS
+        """
+        super().__init_subclass__(**kwargs)
+        fields = []
+        for klass in reversed(cls.__mro__):
+            if not issubclass(klass, Base) or klass is Base:
+                continue
+            slots = klass.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            fields.extend(slot for slot in slots if slot not in fields)
+        cls.FIELDS = tuple(fields)
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
@@ -22,18 +274,56 @@ class Base():
         s_class = str(self.__class__.__name__)
         if DATA.get(s_class) is None:
             DATA[s_class] = {}
+            INDEX_DATA[s_class] = Index(self.INDEXES)
+            ORDERS.pop(s_class, None)
 
         self.id = kwargs.get('id', str(uuid.uuid4()))
-        if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
-        else:
-            self.created_at = datetime.utcnow()
-        if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
-        else:
-            self.updated_at = datetime.utcnow()
+        now = int(time.time())
+        created_at = kwargs.get('created_at')
+        self._created_at = now if created_at is None \
+            else parse_timestamp(created_at)
+        updated_at = kwargs.get('updated_at')
+        self._updated_at = now if updated_at is None \
+            else parse_timestamp(updated_at)
+
+    @property
+    def created_at(self) -> datetime:
+        """ Creation time, naive UTC
+        """
+        return EPOCH + timedelta(seconds=self._created_at)
+
+    @created_at.setter
+    def created_at(self, value: datetime):
+        """ Set the creation time from a naive UTC datetime
+        """
+        self._created_at = to_timestamp(value)
+
+    @property
+    def updated_at(self) -> datetime:
+        """ Last update time, naive UTC
+        """
+        return EPOCH + timedelta(seconds=self._updated_at)
+
+    @updated_at.setter
+    def updated_at(self, value: datetime):
+        """ Set the last update time from a naive UTC datetime
+        """
+        self._updated_at = to_timestamp(value)
+
+    def __setattr__(self, name: str, value):
+        """ Set an attribute and drop the cached JSON fragments
+        An indexed attribute of a stored object is re-indexed at once,
+        so search sees the new value before the object is saved
+        """
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_fragments', None)
+        if name in self.INDEXES:
+            s_class = self.__class__.__name__
+            with LOCK:
+                objs = DATA.get(s_class)
+                if objs is not None and \
+                        objs.get(getattr(self, 'id', None)) is self:
+                    INDEX_DATA[s_class].add(self.id, self.index_values())
 
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Equality
@@ -47,8 +337,16 @@ class Base():
     def to_json(self, for_serialization: bool = False) -> dict:
         """ Convert the object a JSON dictionary
         """
-        result = {}
-        for key, value in self.__dict__.items():
+        result = {
+            'id': self.id,
+            'created_at': format_timestamp(self._created_at),
+            'updated_at': format_timestamp(self._updated_at),
+        }
+        items = [(key, getattr(self, key, UNSET)) for key in self.FIELDS]
+        items.extend(getattr(self, '__dict__', {}).items())
+        for key, value in items:
+            if value is UNSET:
+                continue
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
@@ -57,54 +355,407 @@ class Base():
                 result[key] = value
         return result
 
+    def to_json_fragment(self, for_serialization: bool = False) -> str:
+        """ to_json serialized to a string
+        The public form, served by the views, is cached until the next
+        attribute write. The for_serialization form is written for every
+        object by save_to_file, caching it would keep the whole data set
+        in memory a second time
+        """
+        if for_serialization:
+            return json.dumps(self.to_json(True))
+        fragments = getattr(self, '_fragments', None)
+        if fragments is None:
+            fragments = {}
+            object.__setattr__(self, '_fragments', fragments)
+        fragment = fragments.get(for_serialization)
+        if fragment is None:
+            fragment = json.dumps(self.to_json(for_serialization))
+            # A write in between replaces the dict, so a stale fragment
+            # is never cached on the object
+            fragments[for_serialization] = fragment
+        return fragment
+
     @classmethod
     def load_from_file(cls):
-        """ Load all objects from file
+        """ Load all objects from file, then replay the journal
         """
+        if STORAGE is not None:
+            STORAGE.load(cls)
+            return
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
+        snapshot_path = ".db_{}.snap".format(s_class)
+        with file_lock(s_class, exclusive=False), LOCK:
+            GENERATIONS[s_class] = file_generation(s_class)
+            DATA[s_class] = {}
+            INDEX_DATA[s_class] = Index(cls.INDEXES)
+            ORDERS.pop(s_class, None)
+            JOURNAL_SIZES[s_class] = 0
+            if path.exists(snapshot_path) and (
+                    not path.exists(file_path) or
+                    path.getmtime(snapshot_path) >= path.getmtime(file_path)):
+                cls.load_snapshot(snapshot_path)
+            elif path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    objs_json = json.load(f)
+                    for obj_id, obj_json in objs_json.items():
+                        cls.load_record(obj_id, obj_json)
+
+            journal_path = ".db_{}.journal".format(s_class)
+            cls.replay_journal(journal_path + ".compacting")
+            JOURNAL_SIZES[s_class] = cls.replay_journal(journal_path)
+
+    @classmethod
+    def refresh(cls):
+        """ Reload the class in shared mode if another process changed
+        its files since they were last loaded or written here
+        """
+        if not SHARED or STORAGE is not None:
             return
+        s_class = cls.__name__
+        if GENERATIONS.get(s_class) != file_generation(s_class):
+            cls.load_from_file()
+
+    @classmethod
+    def load_snapshot(cls, snapshot_path: str):
+        """ Load references to the records of a snapshot file, records
+        are only parsed when their object is needed
+        """
+        s_class = cls.__name__
+        snapshot = Snapshot(snapshot_path)
+        obj_ids = snapshot.ids()
+        DATA[s_class].update(zip(obj_ids, snapshot.references()))
+        INDEX_DATA[s_class].add_all(obj_ids,
+                                    snapshot.index_values(cls.INDEXES))
+
+    @classmethod
+    def load_record(cls, obj_id: str, obj_json: dict):
+        """ Add one record read from file, as an object or, in lazy
+        mode, as the raw record
+        """
+        s_class = cls.__name__
+        if LAZY_LOAD:
+            DATA[s_class][obj_id] = obj_json
+            INDEX_DATA[s_class].add(obj_id, tuple(
+                obj_json.get(attribute) for attribute in cls.INDEXES))
+        else:
+            obj = cls(**obj_json)
+            DATA[s_class][obj_id] = obj
+            INDEX_DATA[s_class].add(obj_id, obj.index_values())
+
+    @classmethod
+    def materialize(cls, obj_id: str, obj) -> TypeVar('Base'):
+        """ Return the object for a DATA entry, building it if the entry
+        is still a raw record or a snapshot reference
+        """
+        if isinstance(obj, Base):
+            return obj
+        s_class = cls.__name__
+        with LOCK:
+            obj = DATA[s_class].get(obj_id)
+            if obj is not None and not isinstance(obj, Base):
+                obj = cls(**Base.record(obj))
+                DATA[s_class][obj_id] = obj
+        return obj
+
+    @staticmethod
+    def record(obj) -> dict:
+        """ Serialized form of a DATA entry: object, raw record or
+        snapshot reference
+        """
+        if type(obj) is dict:
+            return obj
+        if type(obj) is SnapshotRecord:
+            return obj.load()
+        return obj.to_json(True)
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+    @staticmethod
+    def record_fragment(obj) -> str:
+        """ Serialized form of a DATA entry, as a JSON string
+        """
+        if type(obj) is dict:
+            return json.dumps(obj)
+        if type(obj) is SnapshotRecord:
+            return obj.load_fragment()
+        return obj.to_json_fragment(True)
+
+    @classmethod
+    def replay_journal(cls, journal_path: str) -> int:
+        """ Apply the entries of a journal file to the loaded objects
+        Return the number of entries applied
+        """
+        s_class = cls.__name__
+        if not path.exists(journal_path):
+            return 0
+
+        count = 0
+        with open(journal_path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Partially written last entry
+                    break
+                obj_id = entry['id']
+                if entry['op'] == 'save':
+                    cls.load_record(obj_id, entry['obj'])
+                else:
+                    DATA[s_class].pop(obj_id, None)
+                    INDEX_DATA[s_class].discard(obj_id)
+                count += 1
+        return count
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
+        The full file supersedes the journal, which is then removed
+        """
+        if STORAGE is not None:
+            return
+        s_class = cls.__name__
+        file_path = ".db_{}.json".format(s_class)
+        while True:
+            with file_lock(s_class), LOCK:
+                compaction = COMPACTIONS.get(s_class)
+                if compaction is None:
+                    write_json_atomic(file_path, (
+                        (obj_id, Base.record_fragment(obj))
+                        for obj_id, obj in DATA[s_class].items()))
+                    if SNAPSHOT:
+                        objs_json = {obj_id: Base.record(obj) for obj_id, obj
+                                     in DATA[s_class].items()}
+                        write_snapshot(".db_{}.snap".format(s_class),
+                                       objs_json, cls.INDEXES)
+
+                    # A .compacting journal left by an interrupted
+                    # compaction is superseded as well
+                    journal_path = ".db_{}.journal".format(s_class)
+                    for stale_path in (journal_path,
+                                       journal_path + ".compacting"):
+                        if path.exists(stale_path):
+                            os.remove(stale_path)
+                    JOURNAL_SIZES[s_class] = 0
+                    if SHARED:
+                        bump_generation(s_class)
+                    return
+            # Let a running compaction finish first, it would otherwise
+            # overwrite this file with older data
+            compaction.join()
+
+    @classmethod
+    def append_to_journal(cls, op: str, obj_id: str, fragment: str = None):
+        """ Append one save or remove entry to the journal file
+        fragment is the serialized object of a save
+        """
+        s_class = cls.__name__
+        line = '{{"op": {}, "id": {}'.format(json.dumps(op),
+                                             json.dumps(obj_id))
+        if fragment is not None:
+            line += ', "obj": ' + fragment
+        line += "}\n"
+
+        with file_lock(s_class), LOCK:
+            with open(".db_{}.journal".format(s_class), 'a') as f:
+                f.write(line)
+            JOURNAL_SIZES[s_class] = JOURNAL_SIZES.get(s_class, 0) + 1
+            if JOURNAL_SIZES[s_class] > JOURNAL_THRESHOLD and \
+                    COMPACTIONS.get(s_class) is None:
+                cls.compact_journal()
+            if SHARED:
+                bump_generation(s_class)
+
+    @classmethod
+    def compact_journal(cls):
+        """ Fold the journal into the data file in a background thread
+        The journal is set aside, so new entries go to a fresh journal
+        while the objects are written out. In shared mode the compaction
+        runs in the caller, under the inter-process lock
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        journal_path = ".db_{}.journal".format(s_class)
+        compacting_path = journal_path + ".compacting"
+
+        with LOCK:
+            if COMPACTIONS.get(s_class) is not None:
+                return
+            objs = list(DATA[s_class].items())
+            if path.exists(journal_path):
+                if path.exists(compacting_path):
+                    # Left by an interrupted compaction and not folded in
+                    # yet: keep its entries, followed by the newer ones
+                    with open(compacting_path, 'a') as compacting, \
+                            open(journal_path, 'r') as journal:
+                        shutil.copyfileobj(journal, compacting)
+                    os.remove(journal_path)
+                else:
+                    os.replace(journal_path, compacting_path)
+            JOURNAL_SIZES[s_class] = 0
+
+            def _compact():
+                try:
+                    write_json_atomic(file_path, (
+                        (obj_id, Base.record_fragment(obj))
+                        for obj_id, obj in objs))
+                    if path.exists(compacting_path):
+                        os.remove(compacting_path)
+                finally:
+                    with LOCK:
+                        COMPACTIONS.pop(s_class, None)
+
+            if SHARED:
+                _compact()
+                return
+            thread = threading.Thread(target=_compact, daemon=True)
+            COMPACTIONS[s_class] = thread
+            thread.start()
+
+    @staticmethod
+    def join_compactions():
+        """ Wait for the running compactions, registered at exit so a
+        compaction is never cut off
+        """
+        while True:
+            with LOCK:
+                compactions = list(COMPACTIONS.values())
+            if not compactions:
+                return
+            for compaction in compactions:
+                compaction.join()
+
+    def index_values(self) -> tuple:
+        """ Values of the indexed attributes
+        """
+        return tuple(getattr(self, attribute, None)
+                     for attribute in self.INDEXES)
+
+    @classmethod
+    @contextmanager
+    def batch(cls):
+        """ Defer persistence until the block exits, then write each
+        changed class once
+        Only the saves and removes of the calling thread are deferred
+        """
+        BATCH.depth = getattr(BATCH, 'depth', 0) + 1
+        try:
+            yield
+        finally:
+            BATCH.depth -= 1
+            if BATCH.depth == 0:
+                Base.flush()
+
+    @classmethod
+    def flush(cls):
+        """ Write every dirty class to its file
+        Return once the data is on disk, including a flush already
+        running in the write-behind thread
+        """
+        with FLUSH_LOCK:
+            with LOCK:
+                dirty = list(DIRTY.values())
+                DIRTY.clear()
+            for i, klass in enumerate(dirty):
+                try:
+                    klass.save_to_file()
+                except BaseException:
+                    with LOCK:
+                        for other in dirty[i:]:
+                            DIRTY.setdefault(other.__name__, other)
+                    raise
+
+    @classmethod
+    def start_write_behind(cls):
+        """ Start the thread flushing dirty classes every WRITE_BEHIND
+        seconds, and flush them at exit
+        """
+        global FLUSHER
+
+        def _flush_loop():
+            while True:
+                time.sleep(WRITE_BEHIND)
+                try:
+                    Base.flush()
+                except Exception:
+                    pass
+
+        with LOCK:
+            if FLUSHER is not None:
+                return
+            FLUSHER = threading.Thread(target=_flush_loop, daemon=True)
+            FLUSHER.start()
+            atexit.register(Base.flush)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+    def persist(self, op: str):
+        """ Persist the save or remove of this object: mark its class
+        dirty when writes are deferred, otherwise append to the journal
+        or write the whole file
+        Called under LOCK; compactions, which save_to_file waits for,
+        only exist in journal mode where it is not called from here
+        """
+        klass = self.__class__
+        if not SHARED and (getattr(BATCH, 'depth', 0) > 0 or
+                           WRITE_BEHIND > 0):
+            with LOCK:
+                DIRTY[klass.__name__] = klass
+            if WRITE_BEHIND > 0 and FLUSHER is None:
+                klass.start_write_behind()
+        elif JOURNAL:
+            klass.append_to_journal(
+                op, self.id,
+                self.to_json_fragment(True) if op == 'save' else None)
+        else:
+            klass.save_to_file()
 
     def save(self):
         """ Save current object
         """
         s_class = self.__class__.__name__
-        self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        self._updated_at = int(time.time())
+        if STORAGE is not None:
+            STORAGE.save(self)
+            return
+        with file_lock(s_class):
+            self.__class__.refresh()
+            # The change and its journal entry happen under the same
+            # lock, so the journal replays changes in the order they
+            # were applied in memory
+            with LOCK:
+                order = ORDERS.get(s_class)
+                if order is not None and self.id not in DATA[s_class]:
+                    insort(order, self.id)
+                DATA[s_class][self.id] = self
+                INDEX_DATA[s_class].add(self.id, self.index_values())
+                self.persist('save')
 
     def remove(self):
         """ Remove object
         """
+        if STORAGE is not None:
+            STORAGE.remove(self)
+            return
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        with file_lock(s_class):
+            self.__class__.refresh()
+            with LOCK:
+                if DATA[s_class].get(self.id) is None:
+                    return
+                del DATA[s_class][self.id]
+                INDEX_DATA[s_class].discard(self.id)
+                order = ORDERS.get(s_class)
+                if order is not None:
+                    position = bisect_left(order, self.id)
+                    if position < len(order) and order[position] == self.id:
+                        del order[position]
+                self.persist('remove')
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
+        if STORAGE is not None:
+            return STORAGE.count(cls)
+        cls.refresh()
         s_class = cls.__name__
         return len(DATA[s_class].keys())
 
@@ -114,17 +765,58 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def page(cls, limit: int, after: str = None) -> List[TypeVar('Base')]:
+        """ Return up to limit objects ordered by ID, starting after the
+        ID after: a stable order for cursor pagination
+        """
+        if STORAGE is not None:
+            return STORAGE.page(cls, limit, after)
+        cls.refresh()
+        s_class = cls.__name__
+        objs = DATA[s_class]
+        with LOCK:
+            order = ORDERS.get(s_class)
+            if order is None:
+                order = ORDERS[s_class] = sorted(objs.keys())
+            start = 0 if after is None else bisect_right(order, after)
+            obj_ids = order[start:start + limit]
+        return [cls.materialize(obj_id, objs[obj_id])
+                for obj_id in obj_ids if obj_id in objs]
+
+    @classmethod
+    def iterate(cls, batch_size: int = 1000) -> Iterable[TypeVar('Base')]:
+        """ Yield all objects ordered by ID, fetched batch_size at a time
+        """
+        after = None
+        while True:
+            objs = cls.page(batch_size, after)
+            yield from objs
+            if len(objs) < batch_size:
+                return
+            after = objs[-1].id
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
+        if STORAGE is not None:
+            return STORAGE.get(cls, id)
+        cls.refresh()
         s_class = cls.__name__
-        return DATA[s_class].get(id)
+        obj = DATA[s_class].get(id)
+        if obj is None:
+            return None
+        return cls.materialize(id, obj)
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
+        Uses a secondary index when one of the attributes is indexed
         """
+        if STORAGE is not None:
+            return STORAGE.search(cls, attributes)
+        cls.refresh()
         s_class = cls.__name__
 
         def _search(obj):
@@ -135,4 +827,18 @@ class Base():
                     return False
             return True
 
-        return list(filter(_search, DATA[s_class].values()))
+        objs = DATA[s_class]
+        index = INDEX_DATA.get(s_class)
+        obj_ids = index.lookup(attributes) if index is not None else None
+        if obj_ids is None:
+            obj_ids = list(objs.keys())
+        return list(filter(_search, (cls.materialize(obj_id, objs[obj_id])
+                                     for obj_id in obj_ids
+                                     if obj_id in objs)))
+
+
+atexit.register(Base.join_compactions)
+
+if getenv('BASE_STORAGE') == 'sqlite':
+    from models.sqlite_storage import SQLiteStorage
+    STORAGE = SQLiteStorage(getenv('BASE_SQLITE_PATH', '.db.sqlite3'))
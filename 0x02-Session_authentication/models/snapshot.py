@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+""" Snapshot module
+Binary, memory-mapped alternative to the .db_<Class>.json files:
+
+    header   magic, record count, metadata length
+    metadata JSON: record IDs and values of the indexed attributes,
+             in record order
+    entries  offset and length of each record
+    records  one JSON document per object
+
+Loading reads the metadata and keeps one reference per record; the JSON
+documents are only parsed when their object is needed. Snapshots of an
+older format are rejected, regenerate them with python3 -m models.snapshot
+"""
+from typing import Iterable, Iterator, List
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+
+MAGIC = b"BSNAP002"
+HEADER = struct.Struct("<8sIQ")
+ENTRY = struct.Struct("<QI")
+
+
+class SnapshotRecord():
+    """ Reference to one record of a snapshot, parsed on demand
+    """
+    __slots__ = ('snapshot', 'position')
+
+    def __init__(self, snapshot: 'Snapshot', position: int):
+        """ Initialize a reference to the record at index position
+        """
+        self.snapshot = snapshot
+        self.position = position
+
+    def load(self) -> dict:
+        """ Parse the record
+        """
+        return self.snapshot.record_at(self.position)
+
+    def load_fragment(self) -> str:
+        """ The record as stored, without parsing it
+        """
+        return self.snapshot.raw_at(self.position).decode('utf-8')
+
+
+class Snapshot():
+    """ Read access to a snapshot file
+    """
+
+    def __init__(self, file_path: str):
+        """ Open and map a snapshot file
+        """
+        with open(file_path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, meta_length = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError("{} is not a snapshot".format(file_path))
+        self.meta = json.loads(self.data[HEADER.size:
+                                         HEADER.size + meta_length])
+        self.entries_offset = HEADER.size + meta_length
+
+    def __len__(self) -> int:
+        """ Number of records
+        """
+        return self.count
+
+    def ids(self) -> List[str]:
+        """ IDs of the records, in record order
+        """
+        return self.meta['ids']
+
+    def raw_at(self, position: int) -> bytes:
+        """ JSON bytes of the record at position
+        """
+        offset, length = ENTRY.unpack_from(
+            self.data, self.entries_offset + position * ENTRY.size)
+        return self.data[offset:offset + length]
+
+    def record_at(self, position: int) -> dict:
+        """ Parse the record at position
+        """
+        return json.loads(self.raw_at(position))
+
+    def references(self) -> List[SnapshotRecord]:
+        """ SnapshotRecord of every record, in record order
+        """
+        return [SnapshotRecord(self, position)
+                for position in range(self.count)]
+
+    def index_values(self, attributes: Iterable[str]) -> Iterator[tuple]:
+        """ Values of attributes for every record, in record order
+        """
+        columns = [self.meta['indexes'].get(attribute, [None] * self.count)
+                   for attribute in attributes]
+        return zip(*columns) if columns else iter([()] * self.count)
+
+
+def write_snapshot(file_path: str, objs_json: dict,
+                   attributes: Iterable[str] = ()):
+    """ Write the records of objs_json (ID -> record) to a snapshot,
+    through a temporary file and a rename
+    """
+    obj_ids = list(objs_json.keys())
+    meta = json.dumps({'ids': obj_ids, 'indexes': {
+        attribute: [objs_json[i].get(attribute) for i in obj_ids]
+        for attribute in attributes}}).encode('utf-8')
+    records = [json.dumps(objs_json[i]).encode('utf-8') for i in obj_ids]
+
+    offset = HEADER.size + len(meta) + len(obj_ids) * ENTRY.size
+    parts = [HEADER.pack(MAGIC, len(obj_ids), len(meta)), meta]
+    for record in records:
+        parts.append(ENTRY.pack(offset, len(record)))
+        offset += len(record)
+    parts.extend(records)
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(file_path) or '.',
+        prefix=os.path.basename(file_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b"".join(parts))
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def convert(json_path: str, snapshot_path: str,
+            attributes: Iterable[str] = ()):
+    """ Convert a .db_<Class>.json file to a snapshot
+    """
+    with open(json_path, 'r') as f:
+        objs_json = json.load(f)
+    write_snapshot(snapshot_path, objs_json, attributes)
+
+
+if __name__ == "__main__":
+    # python3 -m models.snapshot User UserSession
+    from models.user import User
+    from models.user_session import UserSession
+
+    classes = {klass.__name__: klass for klass in (User, UserSession)}
+    for s_class in sys.argv[1:] or classes.keys():
+        json_path = ".db_{}.json".format(s_class)
+        if os.path.exists(json_path):
+            convert(json_path, ".db_{}.snap".format(s_class),
+                    classes[s_class].INDEXES)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+""" SQLite storage module
+One table per class: the serialized object in a "data" column, plus one
+indexed column per attribute listed in the class INDEXES
+The first load of a class imports the objects of its .db_<Class>.json
+file and journal, once: the import is recorded in the "imports" table,
+and the files themselves are left as is
+"""
+from os import path
+from typing import TypeVar, List
+import json
+import sqlite3
+import threading
+
+from models.storage import Storage
+
+
+def _column_value(value):
+    """ Value stored in an indexed column
+    """
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return json.dumps(value)
+
+
+class SQLiteStorage(Storage):
+    """ Storage engine backed by a SQLite database file
+    Each thread uses its own connection; the SQL of every class is built
+    once, so sqlite3 reuses its prepared statements
+    """
+
+    def __init__(self, file_path: str):
+        """ Initialize the storage on a database file
+        """
+        self.file_path = file_path
+        self.local = threading.local()
+        self.statements = {}
+        self.lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """ Connection of the current thread
+        """
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.file_path, isolation_level=None,
+                                         cached_statements=256)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.local.connection = connection
+        return connection
+
+    def sql(self, cls) -> dict:
+        """ SQL statements of a class, creating its table on first use
+        """
+        statements = self.statements.get(cls.__name__)
+        if statements is not None:
+            return statements
+
+        with self.lock:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS imports "
+                "(class TEXT PRIMARY KEY)")
+            table = '"{}"'.format(cls.__name__)
+            columns = ['"{}"'.format(a) for a in cls.INDEXES]
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS {} (id TEXT PRIMARY KEY, "
+                "data TEXT NOT NULL{})".format(
+                    table, "".join(", " + c for c in columns)))
+            for attribute, column in zip(cls.INDEXES, columns):
+                self.connection.execute(
+                    'CREATE INDEX IF NOT EXISTS "{}_{}" ON {} ({})'.format(
+                        cls.__name__, attribute, table, column))
+
+            statements = {
+                'save': "INSERT INTO {} (id, data{}) VALUES (?, ?{}) "
+                        "ON CONFLICT(id) DO UPDATE SET data = excluded.data"
+                        "{}".format(table,
+                                    "".join(", " + c for c in columns),
+                                    ", ?" * len(columns),
+                                    "".join(", {0} = excluded.{0}".format(c)
+                                            for c in columns)),
+                'remove': "DELETE FROM {} WHERE id = ?".format(table),
+                'get': "SELECT data FROM {} WHERE id = ?".format(table),
+                'all': "SELECT data FROM {} ORDER BY rowid".format(table),
+                'count': "SELECT COUNT(*) FROM {}".format(table),
+                'first_page': "SELECT data FROM {} ORDER BY id "
+                              "LIMIT ?".format(table),
+                'page': "SELECT data FROM {} WHERE id > ? ORDER BY id "
+                        "LIMIT ?".format(table),
+            }
+            self.statements[cls.__name__] = statements
+        return statements
+
+    def load(self, cls):
+        """ Create the table of a class and import the JSON files of
+        models.base, unless that was already done
+        """
+        statements = self.sql(cls)
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            imported = connection.execute(
+                "SELECT 1 FROM imports WHERE class = ?",
+                (cls.__name__,)).fetchone()
+            if imported is None:
+                # A table filled before imports were recorded was
+                # already imported
+                if connection.execute(
+                        statements['count']).fetchone()[0] == 0:
+                    self.import_files(cls)
+                connection.execute("INSERT INTO imports (class) VALUES (?)",
+                                   (cls.__name__,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def import_files(self, cls):
+        """ Import .db_<Class>.json, then replay the journals left by
+        models.base; runs in the transaction of load
+        """
+        file_path = ".db_{}.json".format(cls.__name__)
+        journal_path = ".db_{}.journal".format(cls.__name__)
+        objs_json = {}
+        if path.exists(file_path):
+            with open(file_path, 'r') as f:
+                objs_json = json.load(f)
+        for replay_path in (journal_path + ".compacting", journal_path):
+            if not path.exists(replay_path):
+                continue
+            with open(replay_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Partially written last entry
+                        break
+                    if entry['op'] == 'save':
+                        objs_json[entry['id']] = entry['obj']
+                    else:
+                        objs_json.pop(entry['id'], None)
+        for obj_json in objs_json.values():
+            self.save(cls(**obj_json))
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or update an object
+        """
+        values = [_column_value(v) for v in obj.index_values()]
+        self.connection.execute(
+            self.sql(obj.__class__)['save'],
+            [obj.id, obj.to_json_fragment(True)] + values)
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete an object
+        """
+        self.connection.execute(self.sql(obj.__class__)['remove'], (obj.id,))
+
+    def get(self, cls, obj_id: str) -> TypeVar('Base'):
+        """ Return one object by ID, or None
+        """
+        row = self.connection.execute(self.sql(cls)['get'],
+                                      (obj_id,)).fetchone()
+        if row is None:
+            return None
+        return cls(**json.loads(row[0]))
+
+    def search(self, cls, attributes: dict) -> List[TypeVar('Base')]:
+        """ Return all objects with matching attributes
+        Indexed attributes are matched in SQL, the others on the objects
+        """
+        statements = self.sql(cls)
+        indexed = [(k, v) for k, v in attributes.items()
+                   if k in cls.INDEXES]
+        if indexed:
+            query = statements.get(tuple(k for k, v in indexed))
+            if query is None:
+                query = "SELECT data FROM \"{}\" WHERE {} ORDER BY rowid" \
+                    .format(cls.__name__, " AND ".join(
+                        '"{}" IS ?'.format(k) for k, v in indexed))
+                statements[tuple(k for k, v in indexed)] = query
+            rows = self.connection.execute(
+                query, [_column_value(v) for k, v in indexed])
+        else:
+            rows = self.connection.execute(statements['all'])
+
+        objs = [cls(**json.loads(row[0])) for row in rows]
+        if len(indexed) == len(attributes):
+            return objs
+        return [obj for obj in objs
+                if all(getattr(obj, k) == v for k, v in attributes.items())]
+
+    def page(self, cls, limit: int,
+             after: str = None) -> List[TypeVar('Base')]:
+        """ Return up to limit objects ordered by ID, after the ID after
+        """
+        statements = self.sql(cls)
+        if after is None:
+            rows = self.connection.execute(statements['first_page'],
+                                           (limit,))
+        else:
+            rows = self.connection.execute(statements['page'],
+                                           (after, limit))
+        return [cls(**json.loads(row[0])) for row in rows]
+
+    def count(self, cls) -> int:
+        """ Count all objects
+        """
+        return self.connection.execute(self.sql(cls)['count']).fetchone()[0]
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+""" Storage module
+Interface of the storage engines that can replace the in-memory DATA
+dict and JSON files of models.base
+"""
+from abc import ABC, abstractmethod
+from typing import TypeVar, List
+
+
+class Storage(ABC):
+    """ Storage engine interface
+    Base.save/remove/get/search/count/all delegate to the engine set in
+    models.base.STORAGE; classes are Base subclasses
+    """
+
+    @abstractmethod
+    def load(self, cls):
+        """ Prepare the storage of a class (Base.load_from_file)
+        """
+        pass
+
+    @abstractmethod
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or update an object
+        """
+        pass
+
+    @abstractmethod
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete an object
+        """
+        pass
+
+    @abstractmethod
+    def get(self, cls, obj_id: str) -> TypeVar('Base'):
+        """ Return one object by ID, or None
+        """
+        pass
+
+    @abstractmethod
+    def search(self, cls, attributes: dict) -> List[TypeVar('Base')]:
+        """ Return all objects with matching attributes
+        """
+        pass
+
+    @abstractmethod
+    def page(self, cls, limit: int,
+             after: str = None) -> List[TypeVar('Base')]:
+        """ Return up to limit objects ordered by ID, after the ID after
+        """
+        pass
+
+    @abstractmethod
+    def count(self, cls) -> int:
+        """ Count all objects
+        """
+        pass
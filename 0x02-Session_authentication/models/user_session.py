@@ -9,6 +9,8 @@ class UserSession(Base):
     """
     UserSession class for storing session data in database
     """
+    __slots__ = ('user_id', 'session_id')
+    INDEXES = ('session_id', 'user_id')
 
     def __init__(self, *args: list, **kwargs: dict):
         """
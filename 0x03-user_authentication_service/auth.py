@@ -2,7 +2,11 @@
 """Auth module for user authentication."""
 
 import bcrypt
+import math
+import os
+import time
 import uuid
+from functools import lru_cache
 from typing import Union
 from sqlalchemy.orm.exc import NoResultFound
 
@@ -10,16 +14,98 @@ from db import DB
 from user import User
 
 
-def _hash_password(password: str) -> bytes:
+BCRYPT_TARGET_MS = 250
+# bcrypt's default work factor, calibration never goes below it
+BCRYPT_MIN_ROUNDS = 12
+BCRYPT_MAX_ROUNDS = 31
+# Fixed work factor, set it to give every worker the same cost; 0 to
+# calibrate when Auth is created
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '0'))
+
+
+def _time_hash(rounds: int, repeat: int = 3) -> float:
+    """Measure the time of one bcrypt hash.
+
+    Args:
+        rounds: The bcrypt work factor
+        repeat: Number of measurements, the fastest one is kept
+
+    Returns:
+        float: Hashing time in milliseconds
+    """
+    salt = bcrypt.gensalt(rounds)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", salt)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+@lru_cache(maxsize=None)
+def _calibrate_rounds(target_ms: float = BCRYPT_TARGET_MS) -> int:
+    """Pick the bcrypt work factor for this machine.
+
+    Every extra round doubles the hashing time, so the cost is
+    extrapolated from a measurement at BCRYPT_MIN_ROUNDS, then checked.
+
+    Args:
+        target_ms: Hashing latency budget in milliseconds
+
+    Returns:
+        int: The highest work factor hashing within target_ms, never
+            lower than BCRYPT_MIN_ROUNDS
+    """
+    base_ms = _time_hash(BCRYPT_MIN_ROUNDS)
+    rounds = BCRYPT_MIN_ROUNDS
+    if base_ms < target_ms:
+        rounds += int(math.log2(target_ms / base_ms))
+    rounds = min(rounds, BCRYPT_MAX_ROUNDS)
+    if rounds > BCRYPT_MIN_ROUNDS and _time_hash(rounds, 1) > target_ms:
+        rounds -= 1
+    return rounds
+
+
+def _bcrypt_rounds() -> int:
+    """Work factor for new hashes.
+
+    Returns:
+        int: BCRYPT_ROUNDS when set, never lower than BCRYPT_MIN_ROUNDS,
+            otherwise the calibrated work factor
+    """
+    if BCRYPT_ROUNDS > 0:
+        return min(max(BCRYPT_ROUNDS, BCRYPT_MIN_ROUNDS), BCRYPT_MAX_ROUNDS)
+    return _calibrate_rounds()
+
+
+def _hash_rounds(hashed_password: Union[bytes, str]) -> int:
+    """Read the work factor of a bcrypt hash.
+
+    Args:
+        hashed_password: A "$2b$<cost>$..." bcrypt hash
+
+    Returns:
+        int: The work factor the hash was computed with
+    """
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode('utf-8')
+    return int(hashed_password.split(b"$")[2])
+
+
+def _hash_password(password: str, rounds: int = None) -> bytes:
     """Hash a password with bcrypt.
 
     Args:
         password: The password string to hash
+        rounds: The bcrypt work factor, _bcrypt_rounds() when not given
 
     Returns:
         bytes: The salted hash of the input password
     """
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    if rounds is None:
+        rounds = _bcrypt_rounds()
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds))
 
 
 def _generate_uuid() -> str:
@@ -35,8 +121,13 @@ class Auth:
     """Auth class to interact with the authentication database."""
 
     def __init__(self):
-        """Initialize Auth instance."""
+        """Initialize Auth instance.
+
+        The work factor is picked here, at startup, rather than on the
+        first login.
+        """
         self._db = DB()
+        self._rounds = _bcrypt_rounds()
 
     def register_user(self, email: str, password: str) -> User:
         """Register a new user.
@@ -55,12 +146,16 @@ class Auth:
             self._db.find_user_by(email=email)
             raise ValueError(f"User {email} already exists")
         except NoResultFound:
-            hashed_password = _hash_password(password)
+            hashed_password = _hash_password(password, self._rounds)
             return self._db.add_user(email, hashed_password)
 
     def valid_login(self, email: str, password: str) -> bool:
         """Validate user login credentials.
 
+        A valid password whose hash was computed with a lower work factor
+        than the current one is rehashed and stored; stronger hashes are
+        kept as they are.
+
         Args:
             email: User's email address
             password: User's password
@@ -70,11 +165,19 @@ class Auth:
         """
         try:
             user = self._db.find_user_by(email=email)
-            return bcrypt.checkpw(password.encode('utf-8'),
-                                  user.hashed_password)
         except NoResultFound:
             return False
 
+        if not bcrypt.checkpw(password.encode('utf-8'),
+                              user.hashed_password):
+            return False
+
+        if _hash_rounds(user.hashed_password) < self._rounds:
+            self._db.update_user(user.id,
+                                 hashed_password=_hash_password(
+                                     password, self._rounds))
+        return True
+
     def create_session(self, email: str) -> Union[str, None]:
         """Create a new session for a user.
 
@@ -149,7 +252,7 @@ class Auth:
         """
         try:
             user = self._db.find_user_by(reset_token=reset_token)
-            hashed_password = _hash_password(password)
+            hashed_password = _hash_password(password, self._rounds)
             self._db.update_user(user.id,
                                  hashed_password=hashed_password,
                                  reset_token=None)